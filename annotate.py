@@ -1,50 +1,365 @@
+"""
+Generates an HTML browser for a project: one page per module in which uses
+of names link to their definitions (across files for imported names), every
+name shows its inferred type on hover and lines with warnings are
+highlighted. Modules are analyzed and pages are rendered in a process pool,
+pages are written line by line, and a manifest in the output directory
+records the source of every page so that later runs only regenerate pages
+whose module, or a module they import, changed. With --heat, the per-line
+analysis cost written by heatmap.py is shaded behind the source lines.
+"""
+import os
 import sys
 import ast
+import cgi
+import json
+import optparse
 from itertools import izip
 from operator import itemgetter
-from main import Visitor
+from multiprocessing import Pool, cpu_count
+from main import analyze, cache_key, get_path_for_level
+from index import Recorder
+from watch import Project, project_files, resolve
 
 
-def add_annotation(line, offset, length, label):
-    before = line[:offset]
-    symbol = line[offset:(offset + length)]
-    after = line[(offset + length):]
-    if label is None:
-        return before + '<font color="red">' + symbol + '</font>' + after
-    return before + '<a href="{0}">{1}</a>'.format(label, symbol) + after
+MANIFEST = 'manifest.json'
+STYLE = '''<style>
+body { font-family: monospace; }
+pre a { color: inherit; text-decoration: none; border-bottom: 1px dotted; }
+.warning { background-color: #fdd; }
+.definition { font-weight: bold; }
+</style>
+'''
 
 
-def annotate_line(line, annotations):
-    # apply annotations from right to left so that offsets don't change
-    for annotation in sorted(annotations, key=itemgetter(0), reverse=True):
-        offset, length, label = annotation
-        line = add_annotation(line, offset, length, label)
-    return line
+def page_path(root, filepath):
+    return os.path.relpath(filepath, root) + '.html'
+
+
+def page_link(root, from_filepath, to_filepath, anchor):
+    from_page = page_path(root, from_filepath)
+    to_page = page_path(root, to_filepath)
+    relative = os.path.relpath(to_page, os.path.dirname(from_page) or '.')
+    target = '' if to_filepath == from_filepath else relative
+    return '{0}#{1}'.format(target, anchor) if anchor else target
+
+
+def import_targets(tree, filepath):
+    """Maps names bound by imports to (module filepath, name in module), with
+    a None name when the name is bound to the module itself."""
+    targets = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                parts = alias.name.split('.')
+                if alias.asname is None:
+                    parts = parts[:1]
+                path, is_package = filepath, True
+                for part in parts:
+                    if path is None or not is_package:
+                        path = None
+                        break
+                    path, is_package = resolve(part, path)
+                if path is not None:
+                    targets[alias.asname or parts[0]] = (path, None)
+        elif isinstance(node, ast.ImportFrom):
+            path, is_package = get_path_for_level(filepath, node.level), True
+            parts = node.module.split('.') if node.module else [None]
+            for part in parts:
+                if path is None or not is_package:
+                    path = None
+                    break
+                path, is_package = resolve(part, path)
+            if path is None:
+                continue
+            for alias in node.names:
+                submodule = resolve(alias.name, path)[0] if is_package \
+                    else None
+                targets[alias.asname or alias.name] = (
+                    (submodule, None) if submodule is not None
+                    else (path, alias.name))
+    return targets
+
+
+def analyze_module(filepath):
+    """Runs in a worker process. Returns the data needed to render the page
+    of the module and to link to it from other pages."""
+    with open(filepath) as source_file:
+        source = source_file.read()
+    recorder = Recorder()
+    try:
+        tree = ast.parse(source, filepath)
+        _, warnings, _ = analyze(source, filepath, imported=[],
+                                 recorder=recorder)
+    except Exception as error:  # pylint: disable=broad-except
+        message = '{0}: {1}'.format(error.__class__.__name__, error)
+        return {'filepath': filepath, 'key': cache_key(filepath, source),
+                'error': message, 'definitions': [], 'uses': [],
+                'warnings': [], 'imports': {}, 'exports': {}}
+    exports = {}
+    for scope, name, _, line, _, _, _ in recorder.definitions:
+        if scope == '' and name not in exports:
+            exports[name] = line
+    return {
+        'filepath': filepath,
+        'key': cache_key(filepath, source),
+        'error': None,
+        'definitions': recorder.definitions,
+        'uses': recorder.uses,
+        'warnings': [(w.node.lineno, '{0} ({1})'.format(w.category, w.details)
+                      if w.details else w.category) for w in warnings],
+        'imports': import_targets(tree, filepath),
+        'exports': exports,
+    }
+
+
+def enclosing_scopes(scope):
+    parts = scope.split('.') if scope else []
+    return ['.'.join(parts[:i]) for i in range(len(parts), -1, -1)]
+
+
+class LinkResolver(object):
+    def __init__(self, root, module, pages):
+        self._root = root
+        self._module = module
+        self._pages = pages     # filepath -> exports of every page
+        self._definitions = {}
+        for definition in module['definitions']:
+            scope, name, _, line = definition[:4]
+            self._definitions.setdefault((scope, name), []).append(line)
+
+    def definition_line(self, scope, name, line):
+        for candidate in enclosing_scopes(scope):
+            lines = self._definitions.get((candidate, name))
+            if lines:
+                earlier = [x for x in lines if x <= line]
+                return candidate, earlier[-1] if earlier else lines[0]
+        return None, None
+
+    def link(self, scope, name, line):
+        filepath = self._module['filepath']
+        found_scope, found_line = self.definition_line(scope, name, line)
+        if found_line is None:
+            return None     # a builtin or an undefined name
+        target = self._module['imports'].get(name)
+        if found_scope == '' and target is not None:
+            target_path, target_name = target
+            exports = self._pages.get(target_path)
+            if exports is not None:
+                anchor = ('L{0}'.format(exports[target_name])
+                          if target_name in exports else None)
+                return page_link(self._root, filepath, target_path, anchor)
+        return page_link(self._root, filepath, filepath,
+                         'L{0}'.format(found_line))
 
 
 def group_by_line_number(annotations):
     grouped = {}
     for annotation in annotations:
-        line_number, offset, length, label = annotation
-        grouped.setdefault(line_number, []).append((offset, length, label))
+        line_number, offset, length, start_tag, end_tag = annotation
+        grouped.setdefault(line_number, []).append(
+            (offset, length, start_tag, end_tag))
     return grouped
 
 
-def main():
-    filepath = sys.argv[1]
+def annotate_line(line, annotations):
+    # annotations are applied left to right and the text between them is
+    # escaped; overlapping annotations are dropped
+    parts = []
+    position = 0
+    for offset, length, start_tag, end_tag in sorted(annotations,
+                                                     key=itemgetter(0)):
+        if offset < position or offset + length > len(line):
+            continue
+        parts.append(cgi.escape(line[position:offset]))
+        parts.append(start_tag + cgi.escape(line[offset:offset + length]) +
+                     end_tag)
+        position = offset + length
+    parts.append(cgi.escape(line[position:]))
+    return ''.join(parts)
+
+
+def module_annotations(root, module, pages):
+    resolver = LinkResolver(root, module, pages)
+    annotations = []
+    for scope, name, kind, line, col, type_ in module['uses']:
+        if kind != 'name':
+            continue    # attribute uses only know where the expression starts
+        title = cgi.escape(type_ or 'Unknown', quote=True)
+        link = resolver.link(scope, name, line)
+        start_tag = ('<a href="{0}" title="{1}">'.format(link, title)
+                     if link else '<span title="{0}">'.format(title))
+        annotations.append((line, col, len(name), start_tag,
+                            '</a>' if link else '</span>'))
+    for scope, name, kind, line, col, type_, _ in module['definitions']:
+        if kind in ('variable', 'attribute'):
+            title = cgi.escape(type_ or 'Unknown', quote=True)
+            start_tag = '<span class="definition" title="{0}">'.format(title)
+            annotations.append((line, col, len(name), start_tag, '</span>'))
+    return group_by_line_number(annotations)
+
+
+def heat_attributes(heat, line_number, maximum):
+    """The style and title of a line with analysis cost, shaded relative to
+    the most expensive line of the page."""
+    entry = heat.get(str(line_number))
+    if not entry or maximum <= 0:
+        return None, None
+    alpha = 0.1 + 0.7 * entry['time'] / maximum
+    style = 'background-color: rgba(255,128,0,{0:.2f})'.format(alpha)
+    title = '{0:.2f} ms, {1} visits'.format(entry['time'] * 1000,
+                                           entry['visits'])
+    return style, title
+
+
+def render_page(arguments):
+    """Runs in a worker process. Writes the page one line at a time."""
+    root, output_dir, module, pages = arguments
+    filepath = module['filepath']
+    path = os.path.join(output_dir, page_path(root, filepath))
+    if not os.path.isdir(os.path.dirname(path)):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            pass    # created by another worker
     with open(filepath) as source_file:
-        source = source_file.read()
-    tree = ast.parse(source, filepath)
-    visitor = Visitor(filepath)
-    visitor.visit(tree)
-    lines = source.splitlines()
-    annotations = visitor.annotations()
-    grouped = group_by_line_number(annotations)
-    pairs = izip(lines, (grouped.get(i + 1, []) for i in range(len(lines))))
-    output = '\n'.join([annotate_line(*x) for x in pairs])
-    print('<pre>')
-    print(output)
-    print('</pre>')
+        lines = source_file.read().splitlines()
+    grouped = module_annotations(root, module, pages)
+    warnings = {}
+    for line_number, message in module['warnings']:
+        warnings.setdefault(line_number, []).append(message)
+    heat = module.get('heat') or {}
+    maximum = max([x['time'] for x in heat.values()] or [0])
+    with open(path, 'w') as page:
+        title = cgi.escape(os.path.relpath(filepath, root))
+        page.write('<html><head><title>{0}</title>\n{1}</head><body>\n'
+                   '<h1>{0}</h1>\n'.format(title, STYLE))
+        if module['error']:
+            page.write('<p class="warning">Analysis failed: {0}</p>\n'.format(
+                cgi.escape(module['error'])))
+        page.write('<pre>')
+        pairs = izip(lines, (grouped.get(i + 1, [])
+                             for i in range(len(lines))))
+        for i, (line, annotations) in enumerate(pairs):
+            line_number = i + 1
+            messages = list(warnings.get(line_number, []))
+            style, cost = heat_attributes(heat, line_number, maximum)
+            attributes = ' class="warning"' if messages else ''
+            if style:
+                attributes += ' style="{0}"'.format(style)
+                messages.append(cost)
+            if messages:
+                attributes += ' title="{0}"'.format(
+                    cgi.escape('; '.join(messages), quote=True))
+            page.write('<span id="L{0}"{1}>{2}</span>\n'.format(
+                line_number, attributes, annotate_line(line, annotations)))
+        page.write('</pre></body></html>\n')
+    return filepath
+
+
+def write_index(root, output_dir, manifest):
+    with open(os.path.join(output_dir, 'index.html'), 'w') as page:
+        page.write('<html><head><title>{0}</title>\n{1}</head><body>\n'
+                   '<h1>{0}</h1>\n<ul>\n'.format(cgi.escape(root), STYLE))
+        for filepath in sorted(manifest):
+            relative = os.path.relpath(filepath, root)
+            page.write('<li><a href="{0}">{1}</a> ({2} warnings)</li>\n'.format(
+                page_path(root, filepath), cgi.escape(relative),
+                manifest[filepath]['warnings']))
+        page.write('</ul></body></html>\n')
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.rename(path + '.tmp', path)
+
+
+def load_heat(path):
+    """Maps the filepaths in a heatmap.py --heat file to their lines."""
+    with open(path) as heat_file:
+        return json.load(heat_file)['files']
+
+
+def generate(root, output_dir, jobs=None, heat=None):
+    """Returns the filepaths of the regenerated pages. heat maps filepaths
+    to the per-line cost shown on their pages."""
+    root = os.path.abspath(root)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    manifest = load_manifest(output_dir)
+    heat = heat or {}
+    project = Project(root)
+    filepaths = sorted(project_files(root))
+    changed = []
+    for filepath in filepaths:
+        with open(filepath) as source_file:
+            source = source_file.read()
+        try:
+            project.update_dependencies(filepath, ast.parse(source, filepath))
+        except SyntaxError:
+            pass
+        entry = manifest.get(filepath)
+        page = os.path.join(output_dir, page_path(root, filepath))
+        if (entry is None or entry['key'] != cache_key(filepath, source)
+                or entry.get('heat', False) != (filepath in heat)
+                or filepath in heat or not os.path.exists(page)):
+            changed.append(filepath)
+    # importers link to the exports of changed modules and may infer
+    # different types, so they are regenerated too, after the modules they
+    # import and without the summaries of their old sources
+    dirty = project.forget_dependents(changed)
+
+    for filepath in set(manifest) - set(filepaths):
+        page = os.path.join(output_dir, page_path(root, filepath))
+        if os.path.exists(page):
+            os.remove(page)
+        del manifest[filepath]
+
+    pool = Pool(jobs or cpu_count())
+    try:
+        modules = pool.map(analyze_module, dirty)
+        for module in modules:
+            module['heat'] = heat.get(module['filepath'])
+            manifest[module['filepath']] = {
+                'key': module['key'], 'exports': module['exports'],
+                'warnings': len(module['warnings']),
+                'heat': module['heat'] is not None}
+        pages = {path: entry['exports'] for path, entry in manifest.items()}
+        arguments = [(root, output_dir, module, pages) for module in modules]
+        for _ in pool.imap_unordered(render_page, arguments):
+            pass
+    finally:
+        pool.close()
+        pool.join()
+    write_index(root, output_dir, manifest)
+    save_manifest(output_dir, manifest)
+    return dirty
+
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog [options] project-directory output-directory')
+    parser.add_option('-j', '--jobs', dest='jobs', type='int',
+                      default=cpu_count(), help='Number of worker processes')
+    parser.add_option('--heat', dest='heat', default=None,
+                      help='Shade lines by the analysis cost in this file, '
+                      'written by heatmap.py --heat')
+    options, args = parser.parse_args()
+    if len(args) != 2:
+        parser.error('expected a project directory and an output directory')
+    heat = load_heat(options.heat) if options.heat else None
+    regenerated = generate(args[0], args[1], options.jobs, heat)
+    sys.stderr.write('regenerated {0} page(s)\n'.format(len(regenerated)))
 
 
 if __name__ == '__main__':
@@ -1,11 +1,13 @@
-from expr import visit_expression, get_token
+from expr import visit_expression, get_token, NullWarnings
 from evaluate import static_evaluate
 from context import Context, ExtendedContext, Scope, Symbol
 from type_objects import NoneType, Bool, Num, Str, List, Dict, \
     Tuple, Instance, Class, Function, Maybe, Unknown, Union, BaseTuple, Set
 from util import type_subset, known_types, unify_types, UnknownValue, \
-    unifiable_types, comparable_types, type_intersection, type_patterns
+    unifiable_types, comparable_types, type_intersection, type_patterns, \
+    Details
 from inference import maybe_inferences
 from assign import assign
 from function import construct_function_type, FunctionSignature, \
-    FunctionEvaluator, ClassEvaluator
+    FunctionEvaluator, ClassEvaluator, CompactEvaluator, compact_functions, \
+    forget_calls
@@ -3,6 +3,7 @@ from itertools import chain, repeat
 from context import Symbol
 from evaluate import static_evaluate, UnknownValue
 from type_objects import Unknown, List, Set, Tuple, Instance
+from function import note_instance_access
 
 
 def assign_single_target(target, assigned_type, static_value, context):
@@ -21,6 +22,7 @@ def assign_single_target(target, assigned_type, static_value, context):
         if not isinstance(instance, Instance):
             return (target.attr, None, None)
         else:
+            note_instance_access(instance, assignment=True)
             old_symbol = instance.attributes.get(target.attr)
             new_symbol = Symbol(target.attr, assigned_type, static_value)
             instance.attributes.add(new_symbol)
@@ -63,5 +65,8 @@ def assign(target, value, context, warnings, generator=False):
             for target, assign_type, static_value
             in zip(target.elts, assign_types, assign_values)]
     else:
-        return [assign_single_target(target, assign_type,
-                                     static_value, context)]
+        assignment = assign_single_target(target, assign_type,
+                                          static_value, context)
+        if target_token == 'Name' and not generator:
+            context.link_constraint(target.id, value, assign_type)
+        return [assignment]
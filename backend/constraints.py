@@ -0,0 +1,152 @@
+"""
+Constraints on the types of names, collected while a function body is first
+evaluated and applied to the function signature afterwards.
+
+Each assignment to a name starts a new version of it. Versions assigned from
+each other (x = y) are merged with union-find and share one constraint, and
+a version assigned from an operator expression (d = a + b) is linked to that
+expression. When the constraint of a version tightens, its linked
+expressions are visited again with the tighter expected type, which
+constrains the versions of the names they were built from:
+
+    def f(a, b):
+        d = a + b
+        return d - 4    # d is Num, so a and b are Num too
+
+Only strict tightenings are propagated and types only get narrower, so the
+worklist always empties.
+"""
+import ast
+import expr
+from util import type_intersection
+
+
+# expressions that are cheap to visit again and have no side effects
+LINKABLE_NODES = (ast.Name, ast.Num, ast.Str, ast.BinOp, ast.UnaryOp,
+                  ast.BoolOp, ast.Compare, ast.expr_context, ast.operator,
+                  ast.unaryop, ast.boolop, ast.cmpop)
+
+
+def linked_names(node):
+    """The names in node if it can be linked, otherwise None. Cached on the
+    node because function bodies are evaluated for every call."""
+    names = getattr(node, '_linked_names', False)
+    if names is False:
+        nodes = list(ast.walk(node))
+        names = (tuple(set(x.id for x in nodes if isinstance(x, ast.Name)))
+                 if all(isinstance(x, LINKABLE_NODES) for x in nodes)
+                 else None)
+        node._linked_names = names
+    return names
+
+
+class ConstraintGraph(object):
+    def __init__(self):
+        self._parent = []
+        self._size = []
+        self._types = []        # constraint of each root
+        self._links = []        # root -> [(expression, versions of names)]
+        self._current = {}      # name -> latest version
+        self._first = {}        # name -> first version, e.g. the argument
+        self._pinned = None     # versions of a linked expression's names
+        self._worklist = []
+        self._propagating = False
+
+    def _version(self, name, context, new=False, type_=None):
+        if not new:
+            if self._pinned is not None and name in self._pinned:
+                return self._pinned[name]
+            if name in self._current:
+                return self._current[name]
+        version = len(self._parent)
+        self._parent.append(version)
+        self._size.append(1)
+        self._types.append(type_ if new else context.get_type(name))
+        self._links.append([])
+        self._current[name] = version
+        self._first.setdefault(name, version)
+        return version
+
+    def _find(self, version):
+        root = version
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[version] != root:
+            self._parent[version], version = root, self._parent[version]
+        return root
+
+    def _union(self, a, b, context):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        a_type, b_type = self._types[a], self._types[b]
+        merged = (b_type if a_type is None else a_type if b_type is None
+                  else type_intersection(a_type, b_type))
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        self._links[a].extend(self._links[b])
+        self._links[b] = []
+        self._types[a] = merged
+        if merged is not None and (merged != a_type or merged != b_type):
+            self._worklist.append(a)
+            self._propagate(context)
+
+    def constrain(self, name, type_, context):
+        root = self._find(self._version(name, context))
+        old_type = self._types[root]
+        if old_type is None:
+            # like before versions, a name without a type (or after a
+            # conflict) takes the next constraint as it is; propagated
+            # constraints never do this, so propagation cannot cycle
+            if not self._propagating:
+                self._types[root] = type_
+            return
+        new_type = type_intersection(old_type, type_)
+        if new_type == old_type:
+            return
+        self._types[root] = new_type
+        if new_type is not None and len(self._links[root]) > 0:
+            self._worklist.append(root)
+            self._propagate(context)
+
+    def link(self, name, value, type_, context):
+        """Starts a new version of name, which was just assigned value of
+        type type_."""
+        if isinstance(value, ast.Name):
+            other = self._version(value.id, context)
+            self._union(self._version(name, context, True, type_), other,
+                        context)
+            return
+        names = linked_names(value)
+        if names is None:
+            self._version(name, context, True, type_)
+            return
+        versions = {x: self._version(x, context) for x in names}
+        version = self._version(name, context, True, type_)
+        self._links[version].append((value, versions))
+
+    def _propagate(self, context):
+        if self._propagating:
+            return      # the outermost call empties the worklist
+        self._propagating = True
+        try:
+            while len(self._worklist) > 0:
+                root = self._find(self._worklist.pop())
+                type_ = self._types[root]
+                if type_ is None:
+                    continue
+                for expression, versions in list(self._links[root]):
+                    self._pinned = versions
+                    expr.visit_expression(expression, type_, context,
+                                          expr.NullWarnings())
+                    self._pinned = None
+        finally:
+            self._pinned = None
+            self._propagating = False
+
+    def constraints(self):
+        """The constraint of the first version of every name."""
+        return {name: self._types[self._find(version)]
+                for name, version in self._first.items()}
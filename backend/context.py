@@ -1,6 +1,7 @@
 import copy
 from type_objects import NoneType, Bool
-from util import type_intersection, UnknownValue
+from util import UnknownValue
+from constraints import ConstraintGraph
 
 # Tricky: need to support obj1.obj2.x where obj2 is an instance
 # of a class that may not be defined in the current scope
@@ -92,6 +93,10 @@ class Scope(object):
     def remove(self, name):
         del self._symbols[name]
 
+    def clear(self):
+        self._symbols = {}
+        self._return = None
+
     def merge(self, scope):
         assert isinstance(scope, Scope)
         self._symbols.update(scope.symbols())
@@ -115,7 +120,7 @@ class Scope(object):
 class Context(object):
     def __init__(self, layers=None):
         self._scope_layers = [builtin_scope()] if layers is None else layers
-        self._constraints = {}
+        self._constraints = ConstraintGraph()
 
     def __str__(self):
         return '\n'.join([str(layer) for layer in self._scope_layers])
@@ -129,6 +134,12 @@ class Context(object):
         scope."""
         return Context([scope for scope in self._scope_layers])
 
+    def visible_scopes(self):
+        """The scopes that hold symbols, from the bottom layer up, including
+        those of the contexts this one extends."""
+        return [x for x in self._scope_layers
+                if x.names() or x.get_return() is not None]
+
     def begin_scope(self, scope=None):
         self._scope_layers.append(Scope() if scope is None else scope)
 
@@ -172,28 +183,39 @@ class Context(object):
                 return scope
         return None
 
-    def add_constraint(self, name, type_):
-        old_type = self._constraints.get(name, self.get_type(name))
-        self._constraints[name] = (type_intersection(old_type, type_)
-                                   if old_type is not None else type_)
+    # context is the (extended) context that sees the names
+    def add_constraint(self, name, type_, context=None):
+        self._constraints.constrain(name, type_, context or self)
+
+    def link_constraint(self, name, value, type_, context=None):
+        self._constraints.link(name, value, type_, context or self)
 
     def get_constraints(self):
-        return self._constraints
+        return self._constraints.constraints()
 
     def clear_constraints(self):
-        self._constraints = {}
+        self._constraints = ConstraintGraph()
 
 
 class ExtendedContext(Context):
     """ This class gives you a context that you can use and modify normally,
         but which extends a base context that you cannot modify. """
-    def __init__(self, base_context):
+    def __init__(self, base_context, constraints=True):
         self._base_context = base_context
+        # without constraints, names used through this context are not
+        # constrained, e.g. while evaluating calls of an analyzed function
+        self._track_constraints = constraints
         super(ExtendedContext, self).__init__([Scope()])
 
 
-    def add_constraint(self, name, type_):
-        self._base_context.add_constraint(name, type_)
+    def add_constraint(self, name, type_, context=None):
+        if self._track_constraints:
+            self._base_context.add_constraint(name, type_, context or self)
+
+    def link_constraint(self, name, value, type_, context=None):
+        if self._track_constraints:
+            self._base_context.link_constraint(name, value, type_,
+                                               context or self)
 
     def clear_constraints(self):
         self._base_context.clear_constraints()
@@ -208,6 +230,10 @@ class ExtendedContext(Context):
     def copy(self):
         raise RuntimeError('copy is not allowed on ' + self.__class__.__name__)
 
+    def visible_scopes(self):
+        return (self._base_context.visible_scopes()
+                + super(ExtendedContext, self).visible_scopes())
+
     def get(self, name):
         extended = super(ExtendedContext, self).get(name)
         if extended is not None:
@@ -1,8 +1,15 @@
+import ast
 import expr
 from functools import partial
 from operators import get_operator_function
 from type_objects import Instance, Unknown
 from util import UnknownValue, comparable_types
+from function import note_instance_access
+
+
+# literals with more elements than this get no static value, so that large
+# config literals are not copied into every symbol; None has no limit
+STATIC_VALUE_LIMIT = 10000
 
 
 def get_token(node):
@@ -35,54 +42,116 @@ def comparison_evaluate(operator, left, right):
     return operator_evaluate(operator, left_value, right_value)
 
 
-# try to evaluate an expression without executing
-def static_evaluate(node, context):
-    token = get_token(node)
+def _evaluate_Num(node, context):
+    return node.n
+
+
+def _evaluate_Str(node, context):
+    return node.s
+
+
+def _evaluate_Name(node, context):
+    symbol = context.get(node.id)
+    return symbol.get_value() if symbol else UnknownValue()
+
+
+def _evaluate_BoolOp(node, context):
+    values = [static_evaluate(x, context) for x in node.values]
+    return operator_evaluate(get_token(node.op), *values)
+
+
+def _evaluate_UnaryOp(node, context):
+    return operator_evaluate(get_token(node.op),
+                             static_evaluate(node.operand, context))
+
+
+def _evaluate_BinOp(node, context):
+    return operator_evaluate(get_token(node.op),
+                             static_evaluate(node.left, context),
+                             static_evaluate(node.right, context))
+
+
+def _evaluate_Compare(node, context):
+    recur = partial(static_evaluate, context=context)
+    operands = [node.left] + node.comparators
+    operators = map(get_token, node.ops)
+    assert len(operands) == len(operators) + 1
+    values = map(recur, operands)
+    types = map(partial(expr.expression_type, context=context), operands)
+    params = zip(values, types)
+    results = [comparison_evaluate(operators[i], params[i], params[i+1])
+               for i in range(len(operators))]
+    return operator_evaluate('And', *results)
+
+
+def too_large(elements):
+    return (STATIC_VALUE_LIMIT is not None
+            and len(elements) > STATIC_VALUE_LIMIT)
+
+
+def _evaluate_List(node, context):
+    if too_large(node.elts):
+        return UnknownValue()
+    return [static_evaluate(x, context) for x in node.elts]
+
+
+def _evaluate_Set(node, context):
+    if too_large(node.elts):
+        return UnknownValue()
+    return set(static_evaluate(x, context) for x in node.elts)
+
+
+def _evaluate_Dict(node, context):
+    if too_large(node.keys):
+        return UnknownValue()
     recur = partial(static_evaluate, context=context)
-    if token == 'Num':
-        return node.n
-    if token == 'Str':
-        return node.s
-    if token == 'Name':
-        symbol = context.get(node.id)
+    return dict(zip(map(recur, node.keys), map(recur, node.values)))
+
+
+def _evaluate_Tuple(node, context):
+    if too_large(node.elts):
+        return UnknownValue()
+    return tuple(static_evaluate(x, context) for x in node.elts)
+
+
+def _evaluate_IfExp(node, context):
+    test = static_evaluate(node.test, context)
+    if test is True:
+        return static_evaluate(node.body, context)
+    if test is False:
+        return static_evaluate(node.orelse, context)
+    return UnknownValue()
+
+
+def _evaluate_Attribute(node, context):
+    value_type = expr.expression_type(node.value, context)
+    if isinstance(value_type, Instance):
+        note_instance_access(value_type)
+        # pylint: disable=maybe-no-member
+        symbol = value_type.attributes.get(node.attr)
         return symbol.get_value() if symbol else UnknownValue()
-    if token == 'BoolOp':
-        operator = get_token(node.op)
-        return operator_evaluate(operator, *map(recur, node.values))
-    if token == 'UnaryOp':
-        operator = get_token(node.op)
-        return operator_evaluate(operator, recur(node.operand))
-    if token == 'BinOp':
-        operator = get_token(node.op)
-        return operator_evaluate(operator, recur(node.left), recur(node.right))
-    if token == 'Compare':
-        operands = [node.left] + node.comparators
-        operators = map(get_token, node.ops)
-        assert len(operands) == len(operators) + 1
-        values = map(recur, operands)
-        types = map(partial(expr.expression_type, context=context), operands)
-        params = zip(values, types)
-        results = [comparison_evaluate(operators[i], params[i], params[i+1])
-                   for i in range(len(operators))]
-        return operator_evaluate('And', *results)
-    if token == 'List':
-        return list(map(recur, node.elts))
-    if token == 'Set':
-        return set(map(recur, node.elts))
-    if token == 'Dict':
-        return dict(zip(map(recur, node.keys), map(recur, node.values)))
-    if token == 'Tuple':
-        return tuple(map(recur, node.elts))
-    if token == 'IfExp':
-        test = recur(node.test)
-        if test is True:
-            return recur(node.body)
-        if test is False:
-            return recur(node.orelse)
-    if token == 'Attribute':
-        value_type = expr.expression_type(node.value, context)
-        if isinstance(value_type, Instance):
-            # pylint: disable=maybe-no-member
-            symbol = value_type.attributes.get(node.attr)
-            return symbol.get_value() if symbol else UnknownValue()
     return UnknownValue()
+
+
+# the nodes that have a static value, other nodes evaluate to UnknownValue
+EVALUATORS = {
+    ast.Num: _evaluate_Num,
+    ast.Str: _evaluate_Str,
+    ast.Name: _evaluate_Name,
+    ast.BoolOp: _evaluate_BoolOp,
+    ast.UnaryOp: _evaluate_UnaryOp,
+    ast.BinOp: _evaluate_BinOp,
+    ast.Compare: _evaluate_Compare,
+    ast.List: _evaluate_List,
+    ast.Set: _evaluate_Set,
+    ast.Dict: _evaluate_Dict,
+    ast.Tuple: _evaluate_Tuple,
+    ast.IfExp: _evaluate_IfExp,
+    ast.Attribute: _evaluate_Attribute,
+}
+
+
+# try to evaluate an expression without executing
+def static_evaluate(node, context):
+    evaluator = EVALUATORS.get(node.__class__)
+    return evaluator(node, context) if evaluator else UnknownValue()
@@ -1,11 +1,27 @@
+import ast
+from itertools import count
+from thread import get_ident, allocate_lock
 import expr
-from itertools import repeat
-from context import Symbol, Scope
-from type_objects import List, Dict, Unknown, Function, NoneType, Instance
+from context import Symbol, Scope, Context
+from type_objects import List, Dict, Unknown, Function, NoneType, Instance, \
+    Bool, Num, Str, BaseTuple, Tuple, Set, Maybe, Union, Class
 from util import type_intersection
 from evaluate import UnknownValue
 
 
+# calls of a compacted function are remembered by the types and static
+# values of their arguments, up to this many per function; values with longer
+# reprs are not
+MEMO_SIZE = 64
+MEMO_VALUE_LENGTH = 100
+
+_identities = count()   # of functions, kept when an evaluator is compacted
+_evaluations = {}       # thread -> [[identity, identities evaluated, impure]]
+_module_epoch = [0]     # counts assignments to attributes of modules
+_epoch_lock = allocate_lock()
+_load_lock = allocate_lock()
+
+
 def get_token(node):
     return node.__class__.__name__
 
@@ -16,10 +32,78 @@ class NullEvaluator(object):  # for recursion
         return Unknown(), UnknownValue()
 
 
+IMMUTABLE_TYPES = (Unknown, NoneType, Bool, Num, Str, BaseTuple)
+
+
+def immutable_type(type_):
+    """Instances, classes and functions hold scopes that can change after a
+    call returns, other types never change."""
+    if isinstance(type_, IMMUTABLE_TYPES):
+        return True
+    if isinstance(type_, (List, Set)):
+        return immutable_type(type_.item_type)
+    if isinstance(type_, Dict):
+        return immutable_type(type_.key_type) and \
+            immutable_type(type_.value_type)
+    if isinstance(type_, Tuple):
+        return all(immutable_type(x) for x in type_.item_types)
+    if isinstance(type_, Maybe):
+        return immutable_type(type_.subtype)
+    if isinstance(type_, Union):
+        return all(immutable_type(x) for x in type_.subtypes)
+    return False
+
+
+def call_key(argument_scope):
+    """The memo key of a call, or None if it cannot be remembered."""
+    key = []
+    for name in sorted(argument_scope.names()):
+        symbol = argument_scope.get(name)
+        if not immutable_type(symbol.get_type()):
+            return None
+        value = symbol.get_value()
+        shown = None if isinstance(value, UnknownValue) else repr(value)
+        if shown is not None and len(shown) > MEMO_VALUE_LENGTH:
+            return None
+        key.append((name, str(symbol.get_type()), shown))
+    return tuple(key)
+
+
+def note_instance_access(instance, assignment=False):
+    """Called for every attribute of an instance that is read or assigned.
+    The calls being evaluated are not remembered, because the attributes
+    can change, except for reads of module attributes: assignments to those
+    forget every remembered call instead."""
+    if instance.class_name == 'object':     # a module
+        if not assignment:
+            return
+        with _epoch_lock:
+            _module_epoch[0] += 1
+    stack = _evaluations.get(get_ident())
+    if stack:
+        stack[-1][2] = True
+
+
+def remembered(results, key):
+    """The remembered (return type, return value) of a call, or None. A
+    call that was evaluated while none of the functions it evaluated were
+    already being evaluated in this thread gives the same result again as
+    long as that is still the case."""
+    entry = results.get(key) if results else None
+    if entry is None or entry[3] != _module_epoch[0]:
+        return None
+    stack = _evaluations.get(get_ident())
+    if stack:
+        if any(frame[0] in entry[2] for frame in stack):
+            return None
+        stack[-1][1].update(entry[2])
+    return entry[0], entry[1]
+
+
 # "arguments" parameter is node.args for FunctionDef or Lambda
 class FunctionSignature(object):
     def __init__(self, name=None, arguments=None, context=None,
-                 decorator_list=[]):
+                 decorator_list=()):
         self.name = name
         if arguments is None:
             self.names = []
@@ -37,7 +121,7 @@ class FunctionSignature(object):
                          for d in arguments.defaults]
         self.default_types = ([Unknown()] * self.min_count) + default_types
         self.annotated_types = self._get_annotated_types(
-            decorator_list, context)
+            decorator_list, context, len(self.names))
         self.types = [annotated if annotated != Unknown() else default
                       for annotated, default
                       in zip(self.annotated_types, self.default_types)]
@@ -89,12 +173,13 @@ class FunctionSignature(object):
     def get_dict(self):
         return dict(self.get_list())
 
-    def _get_annotated_types(self, decorator_list, context):
+    # returns a list rather than an iterator so that signatures can be pickled
+    def _get_annotated_types(self, decorator_list, context, count):
         types_decorator = [d for d in decorator_list
                            if get_token(d) == 'Call' and d.func.id == 'types']
         return ([expr.expression_type(arg, context)
                  for arg in types_decorator[0].args]
-                if len(types_decorator) == 1 else repeat(Unknown()))
+                if len(types_decorator) == 1 else [Unknown()] * count)
 
     def generic_scope(self):
         scope = Scope()
@@ -122,38 +207,285 @@ class FunctionSignature(object):
 # the FunctionEvaluator is only to evaluate the type and static value of
 # function calls
 class FunctionEvaluator(object):
-    def __init__(self, body, visitor):
+    def __init__(self, body, visitor, shared=False, name=None):
+        """A shared evaluator belongs to a function type, which other
+        analyses, possibly in other threads, can import and call at the same
+        time, so each call evaluates the body with its own clone of
+        visitor."""
+        self.name = name
+        self.identity = next(_identities)
+        # call key -> result, only once the module is analyzed, because until
+        # then the names the body uses can still be added or rebound
+        self.results = None
         self._body = body
         self._visitor = visitor
-        self._recursion_block = False
+        self._shared = shared
+        self._active = set()    # threads evaluating a call, for recursion
+        self._steps = None
+
+    def __getstate__(self):
+        # the lowered body holds handlers, it is rebuilt after loading;
+        # remembered calls refer to the identities of this process
+        state = self.__dict__.copy()
+        state['_steps'] = None
+        state['_active'] = set()
+        state['results'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.identity = next(_identities)
+
+    def _lower(self, visitor):
+        if isinstance(self._body, list):
+            return visitor.lower(self._body)
+        return ((visitor.__class__.visit, self._body),)  # lambda expression
 
     def _evaluate(self, argument_scope):
-        visitor = self._visitor
+        visitor = (self._visitor.clone(constraints=False) if self._shared
+                   else self._visitor)
+        if self._steps is None:
+            self._steps = self._lower(visitor)
         visitor.begin_scope()
         visitor.merge_scope(argument_scope)
-        if isinstance(self._body, list):
-            for stmt in self._body:
-                visitor.visit(stmt)
-        else:
-            visitor.visit(self._body)
+        for handler, stmt in self._steps:
+            handler(visitor, stmt)
         return visitor.end_scope()
 
     def evaluate(self, argument_scope):
-        if self._recursion_block:
-            return Unknown(), UnknownValue()
-        self._recursion_block = True
         if self._body is None:
             return NoneType(), None
-        scope = self._evaluate(argument_scope)
-        self._recursion_block = False
+        thread = get_ident()
+        if thread in self._active:
+            # the result depends on the calls being evaluated, so the calls
+            # evaluated since this function started are not remembered
+            for frame in reversed(_evaluations[thread]):
+                if frame[0] == self.identity:
+                    break
+                frame[2] = True
+            return Unknown(), UnknownValue()
+        key = call_key(argument_scope) if self.results is not None else None
+        if key is not None:
+            result = remembered(self.results, key)
+            if result is not None:
+                return result
+        epoch = _module_epoch[0]
+        frame = [self.identity, set([self.identity]), False]
+        stack = _evaluations.setdefault(thread, [])
+        stack.append(frame)
+        self._active.add(thread)
+        try:
+            scope = self._evaluate(argument_scope)
+        finally:
+            self._active.discard(thread)
+            stack.pop()
+            if stack:
+                stack[-1][1].update(frame[1])
+                stack[-1][2] = stack[-1][2] or frame[2]
+            else:
+                del _evaluations[thread]
         return_type = scope.get_type() or NoneType()
         if return_type != NoneType():
             return_value = scope.get_value() or UnknownValue()
         else:
             return_value = None
+        if (key is not None and not frame[2] and immutable_type(return_type)
+                and (key in self.results or len(self.results) < MEMO_SIZE)):
+            self.results[key] = (return_type, return_value,
+                                 frozenset(frame[1]), epoch)
         return return_type, return_value
 
 
+def body_location(body):
+    return body[0].lineno, body[0].col_offset
+
+
+class ModuleSource(object):
+    """The source of an analyzed module, parsed again the first time one of
+    its compacted functions has to evaluate its body."""
+    def __init__(self, filepath, source):
+        self.filepath = filepath
+        self.source = source
+        self._bodies = None
+        self._lock = allocate_lock()
+
+    def __getstate__(self):
+        return {'filepath': self.filepath, 'source': self.source}
+
+    def __setstate__(self, state):
+        self.__init__(state['filepath'], state['source'])
+
+    def body(self, location):
+        with self._lock:
+            if self._bodies is None:
+                tree = ast.parse(self.source, self.filepath)
+                self._bodies = dict(
+                    (body_location(node.body), node.body)
+                    for node in ast.walk(tree)
+                    if isinstance(node, ast.FunctionDef))
+            return self._bodies[location]
+
+
+class CompactEvaluator(object):
+    """Replaces the evaluator of a function once its module is analyzed.
+    Calls are remembered from then on and answered without the body, which
+    is parsed again from the module source for other calls, and only the
+    scopes the body sees are kept instead of the contexts it was analyzed
+    in."""
+    # there is one for every function of every summary
+    __slots__ = ('name', 'identity', 'results', '_remembering', '_context',
+                 '_source', '_location', '_visitor_class', '_evaluator')
+
+    def __init__(self, evaluator, context, source):
+        # pylint: disable=protected-access
+        self.name = evaluator.name
+        self.identity = evaluator.identity
+        self.results = None
+        self._remembering = True
+        self._context = context
+        self._source = source
+        self._location = body_location(evaluator._body)
+        self._visitor_class = evaluator._visitor.__class__
+        self._evaluator = None
+
+    def __getstate__(self):
+        state = dict((x, getattr(self, x)) for x in self.__slots__)
+        state['results'] = None
+        state['_evaluator'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.identity = next(_identities)
+
+    def _load(self):
+        with _load_lock:
+            if self._evaluator is None:
+                visitor = self._visitor_class(
+                    self._source.filepath, self._context, expr.NullWarnings())
+                evaluator = FunctionEvaluator(
+                    self._source.body(self._location), visitor, shared=True,
+                    name=self.name)
+                evaluator.identity = self.identity
+                if self._remembering and self.results is None:
+                    self.results = {}
+                evaluator.results = self.results
+                self._evaluator = evaluator
+            return self._evaluator
+
+    def filepath(self):
+        return self._source.filepath
+
+    def forget(self):
+        with _load_lock:
+            self.results = None
+            self._remembering = False
+            if self._evaluator is not None:
+                self._evaluator.results = None
+
+    def resume(self):
+        with _load_lock:
+            self._remembering = True
+            if self._evaluator is not None:
+                self.results = {}
+                self._evaluator.results = self.results
+
+    def evaluate(self, argument_scope):
+        evaluator = self._evaluator
+        if evaluator is None:
+            key = call_key(argument_scope)
+            result = remembered(self.results, key) if key is not None \
+                else None
+            if result is not None:
+                return result
+            evaluator = self._load()
+        return evaluator.evaluate(argument_scope)
+
+
+def reachable_functions(root):
+    """Yields the Function types reachable from a scope or type, without
+    looking inside imported modules."""
+    seen = set()
+    pending = [root]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Scope):
+            pending.extend(x.get_type() for x in item.symbols().values())
+            if item.get_return() is not None:
+                pending.append(item.get_return().get_type())
+        elif isinstance(item, Function):
+            yield item
+            pending.append(item.return_type)
+            pending.extend(item.signature.types)
+            if item.instance is not None:
+                pending.append(item.instance)
+        elif isinstance(item, Class):
+            pending.extend([item.attributes, item.return_type])
+            pending.extend(item.signature.types)
+        elif isinstance(item, Instance):
+            if item.class_name != 'object':     # imported modules are done
+                pending.append(item.attributes)
+        elif isinstance(item, (List, Set)):
+            pending.append(item.item_type)
+        elif isinstance(item, Dict):
+            pending.extend([item.key_type, item.value_type])
+        elif isinstance(item, Tuple):
+            pending.extend(item.item_types)
+        elif isinstance(item, Maybe):
+            pending.append(item.subtype)
+        elif isinstance(item, Union):
+            pending.extend(item.subtypes)
+
+
+def compact_functions(scope, filepath, source):
+    """Replaces the evaluators of the functions defined in filepath that
+    are reachable from scope with CompactEvaluators. Lambdas and functions
+    of other modules keep their evaluators."""
+    # pylint: disable=protected-access
+    module_source = ModuleSource(filepath, source)
+    replacements = {}   # id of an evaluator -> its CompactEvaluator
+    contexts = {}       # ids of the visible scopes -> their context
+    for function in reachable_functions(scope):
+        evaluator = function.evaluator
+        if id(evaluator) in replacements:
+            function.evaluator = replacements[id(evaluator)]
+        elif (isinstance(evaluator, CompactEvaluator)
+                and evaluator.filepath() == filepath):
+            evaluator.resume()      # a definition reused by watch mode
+        elif (isinstance(evaluator, FunctionEvaluator)
+                and evaluator._shared
+                and isinstance(evaluator._body, list)
+                and evaluator._body
+                and getattr(evaluator._visitor, '_filepath',
+                            None) == filepath):
+            scopes = evaluator._visitor._context.visible_scopes()
+            key = tuple(id(x) for x in scopes)
+            if key not in contexts:
+                # the top layer is left for the body's own names
+                contexts[key] = Context(scopes + [Scope()])
+            replacement = CompactEvaluator(evaluator, contexts[key],
+                                           module_source)
+            replacements[id(evaluator)] = replacement
+            function.evaluator = replacement
+    return len(replacements)
+
+
+def forget_calls(root, filepath):
+    """Forgets the remembered calls of the compacted functions of filepath
+    that are reachable from root, and stops remembering calls until the
+    module is compacted again. For definitions that are reused when the
+    module is analyzed again, see incremental.Definitions."""
+    for function in reachable_functions(root):
+        evaluator = function.evaluator
+        if (isinstance(evaluator, CompactEvaluator)
+                and evaluator.filepath() == filepath):
+            evaluator.forget()
+
+
 class ClassEvaluator(object):
     def __init__(self, class_object):
         self._class_object = class_object
@@ -194,7 +526,7 @@ def construct_function_type(functiondef_node, visitor, instance=None):
                      or (name == '__init__' and not instance.initialized)
                      or (name != '__init__' and instance.initialized)
                      else visitor.clone())
-    first_evaluator = FunctionEvaluator(body, first_visitor)
+    first_evaluator = FunctionEvaluator(body, first_visitor, name=name)
     first_visitor.context().clear_constraints()
     argument_scope = signature.generic_scope()
     if instance is not None:
@@ -202,5 +534,7 @@ def construct_function_type(functiondef_node, visitor, instance=None):
         argument_scope.add(self_symbol)
     return_type, _ = first_evaluator.evaluate(argument_scope)
     signature.constrain_types(first_visitor.context().get_constraints())
-    evaluator = FunctionEvaluator(body, visitor.clone())
+    # constraints are only collected on the first evaluation above
+    evaluator = FunctionEvaluator(body, visitor.clone(constraints=False),
+                                  shared=True, name=name)
     return Function(signature, return_type, evaluator)
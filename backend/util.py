@@ -8,6 +8,16 @@ class UnknownValue(object):
         return self.__class__.__name__
 
 
+class Details(object):
+    """Warning details that are formatted only when they are shown."""
+    def __init__(self, template, *args):
+        self.template = template
+        self.args = args
+
+    def __str__(self):
+        return self.template.format(*self.args)
+
+
 def pairwise(iterable):
     a, b = tee(iterable)
     next(b, None)
@@ -0,0 +1,75 @@
+"""
+Measures how long it takes to evaluate a call of the same function again,
+which is where function bodies are interpreted repeatedly: a module defining
+one function is analyzed without calls and with many calls, and the
+difference is divided by the number of calls.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import optparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+
+
+FUNCTION = '''def f(a, b):
+    """Docstring."""
+    c = a + b
+    d = c * 2
+    e = [c, d, a]
+    if c > d:
+        g = c - 1
+    else:
+        g = d + 1
+    for x in e:
+        g += x
+    pass
+    return g + len(e)
+'''
+
+
+def source(calls):
+    return FUNCTION + ''.join('r{0} = f({0}, 2)\n'.format(i)
+                              for i in range(calls))
+
+
+def best_time(text, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        analyzer.analyze(text, 'calls.py')
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--calls', dest='calls', type='int', default=2000)
+    parser.add_option('--repeat', dest='repeat', type='int', default=5)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    analyzer.builtin_context()     # load the builtins outside the timings
+    base = best_time(source(0), options.repeat)
+    total = best_time(source(options.calls), options.repeat)
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'calls': options.calls,
+        'definition_time': base,
+        'total_time': total,
+        'time_per_call': (total - base) / options.calls,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Measures how much memory module summaries keep after compaction. One large
+generated module is analyzed and the objects reachable from its summary,
+without the builtins, are counted and sized before and after its functions
+are compacted. Then a generated project is analyzed with analyze_many, which
+keeps every summary, with compaction off and on, each in a fresh process,
+and the peak resident memory is reported.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import types
+import shutil
+import platform
+import tempfile
+import optparse
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+from backend import Instance, compact_functions
+from generate import generate_project
+
+
+# code and classes are shared by every analysis, only data is counted
+SHARED_TYPES = (type, types.ClassType, types.ModuleType, types.FunctionType,
+                types.BuiltinFunctionType, types.MethodType, types.CodeType)
+
+
+def reachable(root, excluded=frozenset()):
+    """Returns {id: object} of the objects reachable from root."""
+    found = {}
+    pending = [root]
+    while pending:
+        item = pending.pop()
+        if id(item) in found or id(item) in excluded \
+                or isinstance(item, SHARED_TYPES):
+            continue
+        found[id(item)] = item
+        pending.extend(gc.get_referents(item))
+    return found
+
+
+def footprint(root, excluded):
+    objects = reachable(root, excluded)
+    return {'objects': len(objects),
+            'bytes': sum(sys.getsizeof(x) for x in objects.values())}
+
+
+def measure_module(path):
+    with open(path) as source_file:
+        source = source_file.read()
+    builtins = reachable(analyzer.builtin_context())
+    start = time.time()
+    scope, _, _ = analyzer.analyze(source, path, inference_only=True)
+    analysis_time = time.time() - start
+    module = Instance('object', scope)
+    gc.collect()
+    before = footprint(module, builtins)
+    start = time.time()
+    compacted = compact_functions(scope, path, source)
+    compaction_time = time.time() - start
+    gc.collect()
+    after = footprint(module, builtins)
+    return {'lines': source.count('\n'), 'functions': compacted,
+            'analysis_time': analysis_time,
+            'compaction_time': compaction_time,
+            'before': before, 'after': after}
+
+
+def peak_memory():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) << 10
+    return None
+
+
+def analyze_project(paths, compact, queue):
+    analyzer.CACHE_DIR = tempfile.mkdtemp(prefix='pystarch-compaction-cache-')
+    analyzer.COMPACT_SUMMARIES = compact
+    try:
+        start = time.time()
+        failed = sum(1 for result in analyzer.analyze_many(paths)
+                     if result.error is not None)
+        elapsed = time.time() - start
+        gc.collect()
+        queue.put({'compact': compact, 'wall_time': elapsed,
+                   'failed': failed, 'peak_memory': peak_memory(),
+                   'resident_memory': analyzer.resident_memory()})
+    finally:
+        shutil.rmtree(analyzer.CACHE_DIR)
+
+
+def run_project(paths, compact):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=analyze_project,
+                                      args=(paths, compact, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--functions', dest='functions', type='int',
+                      default=1000, help='Functions in the large module')
+    parser.add_option('--classes', dest='classes', type='int', default=100,
+                      help='Classes in the large module')
+    parser.add_option('--modules', dest='modules', type='int', default=200,
+                      help='Modules in the project')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='pystarch-compaction-')
+    try:
+        large = generate_project(os.path.join(directory, 'large'), modules=1,
+                                 functions=options.functions,
+                                 classes=options.classes)[0]
+        paths = generate_project(os.path.join(directory, 'project'),
+                                 modules=options.modules, group_size=50)
+        projects = [run_project(paths, False), run_project(paths, True)]
+        module = measure_module(large)
+    finally:
+        shutil.rmtree(directory)
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'module': module,
+        'project': {'modules': options.modules, 'runs': projects},
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares analyzing the modules of a generated project with all checks, as for
+the file being checked, and inference-only, as import_module does for
+dependencies. The summaries of imported modules are cached before timing so
+that each measurement covers one module's own analysis.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import optparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+from generate import generate_project, add_options, get_settings
+
+
+def analyze_all(sources, inference_only):
+    start = time.time()
+    for path, source in sources:
+        analyzer.analyze(source, path, imported=[path],
+                         inference_only=inference_only)
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser()
+    add_options(parser)
+    parser.add_option('--repeat', dest='repeat', type='int', default=5)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+    settings = get_settings(options)
+
+    project_dir = tempfile.mkdtemp(prefix='pystarch-bench-project-')
+    cache_dir = tempfile.mkdtemp(prefix='pystarch-bench-cache-')
+    analyzer.CACHE_DIR = cache_dir
+    try:
+        sources = []
+        for path in generate_project(project_dir, **settings):
+            with open(path) as source_file:
+                sources.append((path, source_file.read()))
+        analyzer.builtin_context()
+        analyze_all(sources, True)      # fills the dependency summaries
+        full = min(analyze_all(sources, False)
+                   for _ in range(options.repeat))
+        inference_only = min(analyze_all(sources, True)
+                             for _ in range(options.repeat))
+    finally:
+        shutil.rmtree(project_dir)
+        shutil.rmtree(cache_dir)
+
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'synthetic': settings,
+        'full': full,
+        'inference_only': inference_only,
+        'speedup': full / inference_only,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
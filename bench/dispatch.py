@@ -0,0 +1,127 @@
+"""
+Measures the cost per node of the functions that dispatch on the class of
+an expression node: each golden testcase is analyzed, then every expression
+node in it is passed to visit_expression, static_evaluate and show_node in
+the context of the analyzed module, and the best time per node of each node
+class is printed as JSON. For leaves like Name and Num the time is mostly
+the dispatch itself.
+"""
+import os
+import sys
+import ast
+import json
+import time
+import platform
+import optparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+from backend import expr, static_evaluate, Unknown
+from warning import show_node
+
+
+TESTCASES_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'test', 'testcases')
+
+
+def load_modules():
+    """Returns (context, expression nodes) of every testcase that can be
+    analyzed."""
+    modules = []
+    for filename in sorted(os.listdir(TESTCASES_DIR)):
+        if not filename.endswith('.py'):
+            continue
+        filepath = os.path.join(TESTCASES_DIR, filename)
+        with open(filepath) as source_file:
+            source = source_file.read()
+        try:
+            scope, _, _ = analyzer.analyze(source, filepath)
+        except Exception:   # pylint: disable=broad-except
+            continue
+        context = analyzer.builtin_context().copy()
+        context.begin_scope(scope)
+        nodes = [node for node in ast.walk(ast.parse(source, filepath))
+                 if isinstance(node, ast.expr)]
+        modules.append((context, nodes))
+    return modules
+
+
+FUNCTIONS = {
+    'visit_expression': lambda node, context: expr.visit_expression(
+        node, Unknown(), context),
+    'static_evaluate': static_evaluate,
+    'show_node': lambda node, context: show_node(node),
+}
+
+
+def usable_nodes(modules):
+    """Drops the nodes that any of the functions fails on outside of the
+    scope they appear in, like yields outside of functions."""
+    usable = []
+    for context, nodes in modules:
+        kept = []
+        for node in nodes:
+            try:
+                for function in FUNCTIONS.values():
+                    function(node, context)
+            except Exception:   # pylint: disable=broad-except
+                continue
+            kept.append(node)
+        usable.append((context, kept))
+    return usable
+
+
+def time_function(function, modules, repeat, loops):
+    """Returns {node class name: best seconds per call}."""
+    best = {}
+    for context, nodes in modules:
+        for node in nodes:
+            times = []
+            for _ in range(repeat):
+                start = time.time()
+                for _ in range(loops):
+                    function(node, context)
+                times.append((time.time() - start) / loops)
+            name = node.__class__.__name__
+            best.setdefault(name, []).append(min(times))
+    return best
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--repeat', dest='repeat', type='int', default=5)
+    parser.add_option('--loops', dest='loops', type='int', default=20,
+                      help='Calls per node in each timing')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    modules = usable_nodes(load_modules())
+    nodes = {}
+    for name, function in sorted(FUNCTIONS.items()):
+        timings = time_function(function, modules, options.repeat,
+                                options.loops)
+        for node_class, times in timings.items():
+            entry = nodes.setdefault(node_class, {'count': len(times)})
+            entry[name + '_us'] = 1e6 * sum(times) / len(times)
+    totals = {}
+    for name in FUNCTIONS:
+        key = name + '_us'
+        count = sum(entry['count'] for entry in nodes.values())
+        totals[key] = sum(entry[key] * entry['count']
+                          for entry in nodes.values()) / count
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'nodes': nodes,
+        'mean': totals,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
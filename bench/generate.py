@@ -0,0 +1,145 @@
+"""
+Generates synthetic projects for benchmarking. The same parameters and seed
+always produce the same files so that results can be compared across versions.
+"""
+import os
+import sys
+import random
+import optparse
+
+
+OPERATORS = ['+', '-', '*']
+DEFAULTS = {
+    'modules': 6,
+    'functions': 5,
+    'classes': 2,
+    'import_depth': 3,
+    'nesting': 4,
+    'optionals': 2,
+    'seed': 0,
+    'group_size': 0,
+}
+
+
+def module_name(index):
+    return 'mod_{0}'.format(index)
+
+
+def nested_expression(rng, names, depth):
+    expression = rng.choice(names)
+    for _ in range(depth):
+        operand = rng.choice(names + ['1', '2', '3'])
+        expression = '({0} {1} {2})'.format(
+            expression, rng.choice(OPERATORS), operand)
+    return expression
+
+
+def optional_conditions(rng, count):
+    lines = []
+    for i in range(count):
+        lines.append('    m{0} = a if a > {1} else None'.format(
+            i, rng.randint(0, 9)))
+        lines.append('    if m{0} is not None:'.format(i))
+        lines.append('        n{0} = m{0} + b'.format(i))
+        lines.append('    else:')
+        lines.append('        n{0} = b'.format(i))
+    return lines
+
+
+def function_source(rng, module_index, function_index, dependencies,
+                    nesting, optionals):
+    lines = ['def func_{0}_{1}(a, b):'.format(module_index, function_index)]
+    lines.append('    x = ' + nested_expression(rng, ['a', 'b'], nesting))
+    lines.extend(optional_conditions(rng, optionals))
+    if dependencies:
+        dependency = rng.choice(dependencies)
+        lines.append('    y = {0}.func_{1}_0(x, b)'.format(
+            module_name(dependency), dependency))
+    else:
+        lines.append('    y = x')
+    lines.append('    return y')
+    return lines
+
+
+def class_source(rng, module_index, class_index, nesting):
+    name = 'Class_{0}_{1}'.format(module_index, class_index)
+    return [
+        'class {0}(object):'.format(name),
+        '    def __init__(self, value):',
+        '        self.value = value',
+        '        self.label = "{0}"'.format(name),
+        '',
+        '    def method(self, a, b):',
+        '        return ' + nested_expression(rng, ['a', 'b'], nesting),
+        '',
+        '    def combine(self, other):',
+        '        return self.value + other',
+    ]
+
+
+def module_source(rng, index, options):
+    first = max(0, index - options['import_depth'])
+    if options['group_size'] > 0:
+        # modules only import from their own group, which bounds the call
+        # chains through imported functions in very large projects
+        first = max(first, index - index % options['group_size'])
+    dependencies = list(range(first, index))
+    lines = ['import ' + module_name(d) for d in dependencies]
+    lines.append('')
+    for class_index in range(options['classes']):
+        lines.extend(class_source(rng, index, class_index,
+                                  options['nesting']))
+        lines.append('')
+    for function_index in range(options['functions']):
+        lines.extend(function_source(rng, index, function_index, dependencies,
+                                     options['nesting'], options['optionals']))
+        lines.append('')
+    for class_index in range(options['classes']):
+        lines.append('instance_{0} = Class_{1}_{0}(1)'.format(
+            class_index, index))
+        lines.append('value_{0} = instance_{0}.method(1, 2)'.format(
+            class_index))
+    if options['functions'] > 0:
+        lines.append('result = func_{0}_0(1, 2)'.format(index))
+    return '\n'.join(lines) + '\n'
+
+
+def generate_project(directory, **options):
+    """Write the project into directory and return the module paths in
+    dependency order."""
+    settings = dict(DEFAULTS)
+    settings.update(options)
+    rng = random.Random(settings['seed'])
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    paths = []
+    for index in range(settings['modules']):
+        path = os.path.join(directory, module_name(index) + '.py')
+        with open(path, 'w') as module_file:
+            module_file.write(module_source(rng, index, settings))
+        paths.append(path)
+    return paths
+
+
+def add_options(parser):
+    for name, default in sorted(DEFAULTS.items()):
+        parser.add_option('--' + name.replace('_', '-'), dest=name,
+                          type='int', default=default)
+
+
+def get_settings(options):
+    return {name: getattr(options, name) for name in DEFAULTS}
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] directory')
+    add_options(parser)
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected an output directory')
+    paths = generate_project(args[0], **get_settings(options))
+    sys.stdout.write('\n'.join(paths) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Measures the analysis of a module holding one very large dict literal, like
+generated config modules, with the static value limit on and off and with
+literal sampling. Each configuration runs in a fresh process so that peak
+memory is its own; parsing alone is measured too as the floor.
+"""
+import os
+import sys
+import ast
+import json
+import time
+import platform
+import resource
+import optparse
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+from backend import expr, evaluate
+
+
+def dict_source(entries):
+    items = ''.join("    'key{0}': {0},\n".format(i) for i in range(entries))
+    return 'CONFIG = {\n' + items + '}\nvalue = CONFIG["key1"] + 1\n'
+
+
+def measure(source, sample_size, static_limit, parse_only, queue):
+    expr.LITERAL_SAMPLE_SIZE = sample_size
+    evaluate.STATIC_VALUE_LIMIT = static_limit
+    analyzer.builtin_context()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    if parse_only:
+        ast.parse(source)
+    else:
+        analyzer.analyze(source, 'config.py')
+    elapsed = time.time() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({'wall_time': elapsed, 'peak_memory_kb': after,
+               'peak_memory_growth_kb': after - before})
+
+
+def run_case(name, source, sample_size=None, static_limit=None,
+             parse_only=False):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=measure,
+        args=(source, sample_size, static_limit, parse_only, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    result.update({'name': name, 'sample_size': sample_size,
+                   'static_value_limit': static_limit})
+    return result
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--entries', dest='entries', type='int',
+                      default=100000)
+    parser.add_option('--sample', dest='sample', type='int', default=1000,
+                      help='Sample size for the sampled configuration')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    source = dict_source(options.entries)
+    limit = evaluate.STATIC_VALUE_LIMIT
+    cases = [
+        run_case('parse only', source, parse_only=True),
+        run_case('no static value limit', source),
+        run_case('default', source, static_limit=limit),
+        run_case('sampled', source, options.sample, limit),
+    ]
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'entries': options.entries,
+        'cases': cases,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
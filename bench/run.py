@@ -0,0 +1,150 @@
+"""
+Runs main.analyze over the golden testcases and a generated synthetic
+project and prints wall time, peak memory and node visit counts as JSON.
+Each case runs in a fresh process with an empty module cache so that the
+numbers do not depend on what ran before.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import optparse
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main as analyzer
+import visitor
+from backend import expr
+from generate import generate_project, add_options, get_settings
+
+
+TESTCASES_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'test', 'testcases')
+
+
+class VisitCounter(object):
+    def __init__(self):
+        self.statements = 0
+        self.expressions = 0
+
+    def install(self):
+        visit = visitor.ScopeVisitor.visit
+        lower = visitor.ScopeVisitor.lower
+        visit_expression = expr._visit_expression
+
+        def counting_visit(this, node):
+            self.statements += 1
+            return visit(this, node)
+
+        def counting(handler):
+            def counting_handler(this, node):
+                self.statements += 1
+                return handler(this, node)
+            return counting_handler
+
+        # lowered function bodies call their handlers without visit()
+        def counting_lower(this, body):
+            return tuple((counting(handler), stmt)
+                         for handler, stmt in lower(this, body))
+
+        def counting_visit_expression(*args):
+            self.expressions += 1
+            return visit_expression(*args)
+
+        visitor.ScopeVisitor.visit = counting_visit
+        visitor.ScopeVisitor.lower = counting_lower
+        expr._visit_expression = counting_visit_expression
+
+
+def analyze_files(paths):
+    warning_count = 0
+    for path in paths:
+        with open(path) as source_file:
+            source = source_file.read()
+        _, warnings, _ = analyzer.analyze(source, path)
+        warning_count += len(warnings)
+    return warning_count
+
+
+def measure(name, paths, queue):
+    cache_dir = tempfile.mkdtemp(prefix='pystarch-bench-cache-')
+    analyzer.CACHE_DIR = cache_dir
+    counter = VisitCounter()
+    counter.install()
+    result = {'name': name, 'files': len(paths)}
+    start = time.time()
+    try:
+        result['warnings'] = analyze_files(paths)
+    except Exception as error:  # pylint: disable=broad-except
+        result['error'] = '{0}: {1}'.format(error.__class__.__name__, error)
+    finally:
+        shutil.rmtree(cache_dir)
+    result['wall_time'] = time.time() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    result['peak_memory_kb'] = usage.ru_maxrss
+    result['statement_visits'] = counter.statements
+    result['expression_visits'] = counter.expressions
+    queue.put(result)
+
+
+def run_case(name, paths):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure,
+                                      args=(name, paths, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def testcase_cases():
+    filenames = sorted(x for x in os.listdir(TESTCASES_DIR)
+                       if x.endswith('.py'))
+    return [('testcases/' + os.path.splitext(x)[0],
+             [os.path.join(TESTCASES_DIR, x)]) for x in filenames]
+
+
+def main():
+    parser = optparse.OptionParser()
+    add_options(parser)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    parser.add_option('--repeat', dest='repeat', type='int', default=1,
+                      help='Run each case this many times and keep the best')
+    parser.add_option('--skip-testcases', dest='skip_testcases',
+                      action='store_true', default=False)
+    options, _ = parser.parse_args()
+    settings = get_settings(options)
+
+    project_dir = tempfile.mkdtemp(prefix='pystarch-bench-project-')
+    try:
+        paths = generate_project(project_dir, **settings)
+        cases = [] if options.skip_testcases else testcase_cases()
+        cases.append(('synthetic', paths))
+        results = []
+        for name, case_paths in cases:
+            runs = [run_case(name, case_paths)
+                    for _ in range(max(1, options.repeat))]
+            results.append(min(runs, key=lambda x: x['wall_time']))
+    finally:
+        shutil.rmtree(project_dir)
+
+    report = {
+        'version': analyzer.__version__,
+        'python': platform.python_version(),
+        'synthetic': settings,
+        'cases': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
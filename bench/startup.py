@@ -0,0 +1,84 @@
+"""
+Measures how long the command line tool takes to print the first warning for
+a one-line file, which is what editor-on-save hooks wait for. The startup of
+a bare interpreter is measured too so that the tool's own share is visible.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import optparse
+import subprocess
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = 'x = 1 + None\n'
+
+
+def time_to_first_line(command):
+    start = time.time()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    line = process.stdout.readline()
+    first_line = time.time() - start
+    process.communicate()
+    return first_line, time.time() - start, line.rstrip()
+
+
+def summarize(times):
+    ordered = sorted(times)
+    return {'min': ordered[0], 'median': ordered[len(ordered) // 2],
+            'max': ordered[-1]}
+
+
+def measure(command, repeat):
+    first_lines, totals, output = [], [], None
+    for _ in range(repeat):
+        first_line, total, output = time_to_first_line(command)
+        first_lines.append(first_line)
+        totals.append(total)
+    return {'first_line': summarize(first_lines),
+            'total': summarize(totals), 'output': output}
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--repeat', dest='repeat', type='int', default=20)
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='pystarch-bench-startup-')
+    try:
+        filepath = os.path.join(directory, 'one_line.py')
+        with open(filepath, 'w') as source_file:
+            source_file.write(SOURCE)
+        main_path = os.path.join(ROOT_DIR, 'main.py')
+        # the first run may have to write the builtin context snapshot
+        time_to_first_line([sys.executable, main_path, filepath])
+        results = {
+            'interpreter': measure([sys.executable, '-c', 'print(1)'],
+                                   options.repeat),
+            'first_warning': measure([sys.executable, main_path, filepath],
+                                     options.repeat),
+        }
+    finally:
+        shutil.rmtree(directory)
+
+    report = {
+        'python': platform.python_version(),
+        'repeat': options.repeat,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmarks the summary store against the previous layout of one pickle file
+per key. Both are filled with the same random blobs, then a sample of keys is
+looked up in a fresh process (cold) and looked up again in the same process
+(warm). Cold lookups still hit the page cache, so they measure opening and
+mapping the store rather than disk reads.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import optparse
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from store import SummaryStore
+from main import cache_key, __version__
+
+
+class FileStore(object):
+    """The previous cache layout, kept here for comparison."""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, key):
+        path = os.path.join(self.directory, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as blob_file:
+            return blob_file.read()
+
+    def put(self, key, blob):
+        with open(os.path.join(self.directory, key), 'wb') as blob_file:
+            blob_file.write(blob)
+
+
+STORES = {'store': SummaryStore, 'files': FileStore}
+
+
+def make_keys(count):
+    return [cache_key('/project/mod_{0}.py'.format(i), str(i))
+            for i in range(count)]
+
+
+def fill(store, keys, rng, min_size, max_size):
+    start = time.time()
+    for key in keys:
+        store.put(key, os.urandom(rng.randint(min_size, max_size)))
+    return time.time() - start
+
+
+def lookup(store, keys):
+    start = time.time()
+    total = 0
+    for key in keys:
+        total += len(store.get(key))
+    return time.time() - start, total
+
+
+def measure_lookups(kind, directory, keys, queue):
+    store = STORES[kind](directory)
+    cold, _ = lookup(store, keys)
+    warm, _ = lookup(store, keys)
+    queue.put({'cold': cold, 'warm': warm})
+
+
+def run_lookups(kind, directory, keys):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure_lookups,
+                                      args=(kind, directory, keys, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def benchmark(kind, entries, lookups, min_size, max_size, seed):
+    directory = tempfile.mkdtemp(prefix='pystarch-bench-store-')
+    try:
+        rng = random.Random(seed)
+        keys = make_keys(entries)
+        fill_time = fill(STORES[kind](directory), keys, rng, min_size,
+                         max_size)
+        sample = [rng.choice(keys) for _ in range(lookups)]
+        result = run_lookups(kind, directory, sample)
+        result.update({
+            'kind': kind,
+            'fill_time': fill_time,
+            'files': len(os.listdir(directory)),
+            'cold_per_lookup_us': result['cold'] / lookups * 1e6,
+            'warm_per_lookup_us': result['warm'] / lookups * 1e6,
+        })
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--entries', dest='entries', type='int',
+                      default=100000)
+    parser.add_option('--lookups', dest='lookups', type='int', default=20000)
+    parser.add_option('--min-size', dest='min_size', type='int', default=200)
+    parser.add_option('--max-size', dest='max_size', type='int',
+                      default=4000)
+    parser.add_option('--seed', dest='seed', type='int', default=0)
+    parser.add_option('--kinds', dest='kinds', default='store,files',
+                      help='Comma separated stores to measure')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write JSON results to this file')
+    options, _ = parser.parse_args()
+
+    results = [benchmark(kind, options.entries, options.lookups,
+                         options.min_size, options.max_size, options.seed)
+               for kind in options.kinds.split(',')]
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'entries': options.entries,
+        'lookups': options.lookups,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Cooperative cancellation for long analyses. The analysis checks the token
+between top-level statements and raises Cancelled once it has been set, so a
+caller can abandon an analysis whose result is no longer wanted.
+"""
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellationToken(object):
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
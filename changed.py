@@ -0,0 +1,68 @@
+"""
+Changed files mode: analyzes only the modules that differ from a git
+revision, for pre-commit hooks and pull request checks. Cache keys only
+cover a module's own source, so the summaries of every module that imports
+a changed module, directly or not, are dropped and inferred again; all other
+imports use the cached summaries. Only the warnings of the changed modules
+are reported.
+"""
+import os
+import sys
+import ast
+import subprocess
+from main import analyze_many
+from watch import Project, project_files
+
+
+def git(root, *args):
+    try:
+        return subprocess.check_output(('git',) + args, cwd=root)
+    except (OSError, subprocess.CalledProcessError) as error:
+        raise RuntimeError('git {0} failed: {1}'.format(args[0], error))
+
+
+def changed_files(root, base):
+    """The existing .py files under root that differ from base, in the
+    working tree or the index."""
+    root = os.path.abspath(root)
+    toplevel = git(root, 'rev-parse', '--show-toplevel').strip()
+    names = git(root, 'diff', '--name-only', base, '--').splitlines()
+    paths = set(os.path.abspath(os.path.join(toplevel, name))
+                for name in names if name.endswith('.py'))
+    return sorted(path for path in paths
+                  if path.startswith(root + os.sep) and os.path.exists(path))
+
+
+def check_changed(root, base):
+    """Returns the changed modules and the (filepath, warnings) of each of
+    them."""
+    changed = changed_files(root, base)
+    project = Project(root)
+    errors = {}
+    for path in project_files(root):
+        with open(path) as source_file:
+            source = source_file.read()
+        try:
+            project.update_dependencies(path, ast.parse(source, path))
+        except SyntaxError as error:
+            errors[path] = '{0}:{1} syntax-error ({2})\n'.format(
+                path, error.lineno, error.msg)
+    dirty = [x for x in project.forget_dependents(changed)
+             if x not in errors]
+    results = dict((x, errors[x]) for x in changed if x in errors)
+    for path in dirty:
+        # dependents are only analyzed for their summaries
+        inference_only = path not in changed
+        for result in analyze_many([path], inference_only):
+            if result.error is not None:
+                # keep checking the rest; a failed dependent is analyzed
+                # again by the modules that import it
+                failure = '{0}: analysis failed ({1}: {2})\n'.format(
+                    path, result.error.__class__.__name__, result.error)
+                if inference_only:
+                    sys.stderr.write(failure)
+                else:
+                    results[path] = failure
+            elif not inference_only:
+                results[path] = str(result.warnings)
+    return changed, [(path, results[path]) for path in changed]
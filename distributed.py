@@ -0,0 +1,380 @@
+"""
+Analyzes a project with workers on several machines. The coordinator parses
+every module, hands modules out in import order (a module is handed out
+once the modules it imports are done) and sends each worker the summaries
+of the imported modules it does not have yet, so no module is analyzed
+twice. Work of workers that die or time out is handed out again, and the
+warnings are written in filepath order once every module is done, so the
+output does not depend on the number or speed of workers.
+
+Workers need the project at the same path as the coordinator, e.g. on a
+shared filesystem or in identical checkouts. Messages are pickled, so
+anyone who knows the key can run code on the coordinator and the workers:
+it must be a secret, given in PYSTARCH_AUTHKEY, to listen on an address
+other than loopback.
+
+    export PYSTARCH_AUTHKEY=$(openssl rand -hex 32)    # on every machine
+    python distributed.py --listen 0.0.0.0:6000 project-directory
+    python distributed.py --worker coordinator-host:6000    # on each node
+
+    python distributed.py --local 4 project-directory   # 4 local workers
+"""
+import os
+import sys
+import ast
+import time
+import socket
+import optparse
+import threading
+import subprocess
+import cPickle as pickle
+from multiprocessing.connection import Listener, Client
+import main
+from main import analyze, cache_key
+from watch import Project, project_files
+
+
+def random_authkey():
+    return os.urandom(32).encode('hex')
+
+
+def is_loopback(host):
+    try:
+        return socket.gethostbyname(host).startswith('127.')
+    except socket.error:
+        return False
+
+
+class Scheduler(object):
+    def __init__(self, project, filepaths, retries):
+        self._project = project
+        self._retries = retries
+        self._condition = threading.Condition()
+        self._pending = set(filepaths)
+        self._running = set()
+        self._attempts = {}
+        self.results = {}       # filepath -> warnings text
+        self.summaries = {}     # filepath -> (cache key, pickled summary)
+        self.retried = 0
+
+    def finish(self, filepath, output):
+        """Records the output of a module that is not handed out, such as
+        one with a syntax error."""
+        with self._condition:
+            self._pending.discard(filepath)
+            self.results[filepath] = output
+            self._condition.notify_all()
+
+    def dependencies(self, filepath):
+        return sorted(self._project.dependencies(filepath))
+
+    def _unfinished(self, filepath):
+        return [x for x in self._project.dependencies(filepath)
+                if x in self._pending or x in self._running]
+
+    def _ready(self):
+        ready = [x for x in self._pending if not self._unfinished(x)]
+        if ready:
+            return min(ready)
+        if self._pending and not self._running:
+            # only import cycles are left: break one deterministically
+            return min(self._pending,
+                       key=lambda x: (len(self._unfinished(x)), x))
+        return None
+
+    def next_task(self):
+        """Blocks until a module can be handed out; returns None when every
+        module is done."""
+        with self._condition:
+            while True:
+                if not self._pending and not self._running:
+                    return None
+                filepath = self._ready()
+                if filepath is not None:
+                    self._pending.remove(filepath)
+                    self._running.add(filepath)
+                    return filepath
+                self._condition.wait(1.0)
+
+    def complete(self, filepath, output, key=None, summary=None):
+        with self._condition:
+            self._running.discard(filepath)
+            self.results[filepath] = output
+            if summary is not None:
+                self.summaries[filepath] = (key, summary)
+            self._condition.notify_all()
+
+    def retry(self, filepath, reason):
+        with self._condition:
+            self._running.discard(filepath)
+            attempts = self._attempts.get(filepath, 0) + 1
+            self._attempts[filepath] = attempts
+            if attempts > self._retries:
+                self.results[filepath] = '{0}:0 analysis-failed ({1})\n'.format(
+                    filepath, reason)
+            else:
+                self.retried += 1
+                self._pending.add(filepath)
+            self._condition.notify_all()
+
+    def done(self):
+        with self._condition:
+            return not self._pending and not self._running
+
+
+class WorkerHandler(threading.Thread):
+    def __init__(self, connection, scheduler, timeout, on_lost=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._connection = connection
+        self._scheduler = scheduler
+        self._timeout = timeout
+        self._on_lost = on_lost
+        self._summaries = set()     # filepaths whose summary the worker has
+
+    def _receive(self):
+        start = time.time()
+        while not self._connection.poll(1.0):
+            if (self._timeout is not None
+                    and time.time() - start > self._timeout):
+                raise IOError('worker timed out')
+        return self._connection.recv()
+
+    def _task(self, filepath):
+        dependencies = self._scheduler.summaries
+        summaries = {}
+        for path in self._scheduler.dependencies(filepath):
+            if path in dependencies and path not in self._summaries:
+                summaries[path] = dependencies[path]
+        with open(filepath) as source_file:
+            source = source_file.read()
+        self._connection.send(('analyze', filepath, source, summaries))
+        self._summaries.update(summaries)
+        return self._receive()
+
+    def run(self):
+        filepath = None
+        try:
+            while True:
+                filepath = self._scheduler.next_task()
+                if filepath is None:
+                    self._connection.send(('stop',))
+                    return
+                reply = self._task(filepath)
+                if reply[0] == 'done':
+                    _, _, output, key, summary = reply
+                    self._summaries.add(filepath)
+                    self._scheduler.complete(filepath, output, key, summary)
+                else:
+                    # the analysis itself failed, which a retry won't fix
+                    self._scheduler.complete(
+                        filepath, '{0}:0 analysis-failed ({1})\n'.format(
+                            filepath, reply[2]))
+                filepath = None
+        except (EOFError, IOError, socket.error) as error:
+            if filepath is not None:
+                self._scheduler.retry(filepath, 'worker lost: {0}'.format(
+                    error))
+            if self._on_lost is not None:
+                self._on_lost()
+        finally:
+            self._connection.close()
+
+
+def analyze_task(filepath, source, summaries):
+    """Analyzes a module with the pickled summaries of its imports and
+    returns the reply a worker sends."""
+    for path, (key, summary) in summaries.items():
+        main._module_summaries[path] = (key, pickle.loads(summary))
+    try:
+        scope, warnings, _ = analyze(source, filepath, imported=[])
+        key = cache_key(filepath, source)
+        module = main.module_summary(scope, filepath, source)
+    except Exception as error:  # pylint: disable=broad-except
+        return ('failed', filepath, '{0}: {1}'.format(
+            error.__class__.__name__, error))
+    main._module_summaries[filepath] = (key, module)
+    try:
+        summary = pickle.dumps(module, pickle.HIGHEST_PROTOCOL)
+    except (RuntimeError, pickle.PicklingError):
+        # too deeply nested to pickle: the warnings are still sent, and
+        # workers analyze the module themselves when they import it
+        summary = None
+    return ('done', filepath, str(warnings), key, summary)
+
+
+def work(address, authkey):
+    """Runs a worker until the coordinator has no more modules."""
+    connection = Client(address, authkey=authkey)
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == 'stop':
+                return
+            _, filepath, source, summaries = message
+            connection.send(analyze_task(filepath, source, summaries))
+    except EOFError:
+        pass    # the coordinator went away
+    finally:
+        connection.close()
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def local_worker(address, authkey):
+    command = [sys.executable, os.path.abspath(__file__), '--worker',
+               '{0}:{1}'.format(*address)]
+    environment = dict(os.environ, PYSTARCH_AUTHKEY=authkey)
+    return subprocess.Popen(command, env=environment)
+
+
+def analyze_remaining(scheduler):
+    """Analyzes the modules that are left in the coordinator, next to any
+    workers that connect in the meantime."""
+    done = set()   # filepaths whose summary this process has
+    while True:
+        filepath = scheduler.next_task()
+        if filepath is None:
+            return
+        summaries = dict((x, scheduler.summaries[x])
+                         for x in scheduler.dependencies(filepath)
+                         if x in scheduler.summaries and x not in done)
+        done.update(summaries)
+        with open(filepath) as source_file:
+            reply = analyze_task(filepath, source_file.read(), summaries)
+        if reply[0] == 'done':
+            done.add(filepath)
+            scheduler.complete(filepath, reply[2], reply[3], reply[4])
+        else:
+            scheduler.complete(
+                filepath, '{0}:0 analysis-failed ({1})\n'.format(
+                    filepath, reply[2]))
+
+
+def coordinate(root, address=('localhost', 0), authkey=None,
+               local=0, retries=2, timeout=None, idle_timeout=60.0):
+    """Returns the warnings of every module under root in filepath order,
+    and the scheduler for statistics. When no worker has been connected for
+    idle_timeout seconds, the coordinator analyzes the remaining modules
+    itself; None waits for workers forever. Without an authkey, a random
+    one is used, which only local workers get, and address must be a
+    loopback address."""
+    if authkey is None:
+        if not is_loopback(address[0]):
+            raise RuntimeError('listening on {0} needs a secret authkey, set '
+                               'PYSTARCH_AUTHKEY'.format(address[0]))
+        authkey = random_authkey()
+    project = Project(root)
+    filepaths = sorted(project_files(root))
+    scheduler = Scheduler(project, filepaths, retries)
+    for filepath in filepaths:
+        with open(filepath) as source_file:
+            source = source_file.read()
+        try:
+            project.update_dependencies(filepath, ast.parse(source, filepath))
+        except SyntaxError as error:
+            scheduler.finish(filepath, '{0}:{1} syntax-error ({2})\n'.format(
+                filepath, error.lineno, error.msg))
+
+    listener = Listener(address, authkey=authkey)
+    processes = []
+    handlers = []
+    lock = threading.Lock()
+
+    def replace_local_worker():
+        # a lost local worker is restarted while there is work left
+        with lock:
+            if not scheduler.done():
+                processes.append(local_worker(listener.address, authkey))
+
+    def accept():
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception:   # pylint: disable=broad-except
+                return          # closed, or a client failed to authenticate
+            handler = WorkerHandler(connection, scheduler, timeout,
+                                    replace_local_worker if local else None)
+            with lock:
+                handlers.append(handler)
+            handler.start()
+
+    acceptor = threading.Thread(target=accept)
+    acceptor.daemon = True
+    acceptor.start()
+    sys.stderr.write('-- coordinator listening on {0}:{1}\n'.format(
+        *listener.address))
+    for _ in range(local):
+        processes.append(local_worker(listener.address, authkey))
+    try:
+        idle_since = time.time()
+        while not scheduler.done():
+            time.sleep(0.05)
+            with lock:
+                connected = any(x.is_alive() for x in handlers)
+            if connected:
+                idle_since = time.time()
+            elif (idle_timeout is not None
+                    and time.time() - idle_since > idle_timeout):
+                sys.stderr.write('-- no worker connected for {0:.0f} s, '
+                                 'analyzing the remaining modules in the '
+                                 'coordinator\n'.format(idle_timeout))
+                analyze_remaining(scheduler)
+    finally:
+        listener.close()
+        for process in processes:
+            process.wait()
+    return [(path, scheduler.results[path]) for path in filepaths], scheduler
+
+
+def run():
+    parser = optparse.OptionParser(
+        usage='%prog [options] project-directory\n'
+              '       %prog --worker host:port')
+    parser.add_option('--listen', dest='listen', default='localhost:0',
+                      metavar='HOST:PORT', help='Address for the coordinator '
+                      'to accept workers on (default: a free local port)')
+    parser.add_option('--local', dest='local', type='int', default=0,
+                      metavar='N', help='Start N local worker processes')
+    parser.add_option('--worker', dest='worker', default=None,
+                      metavar='HOST:PORT', help='Run a worker for the '
+                      'coordinator at this address')
+    parser.add_option('--retries', dest='retries', type='int', default=2,
+                      help='Hand out the work of a lost worker this many '
+                      'times before giving up on the module')
+    parser.add_option('--timeout', dest='timeout', type='float',
+                      default=None, help='Seconds after which a worker that '
+                      'has not answered is considered lost')
+    parser.add_option('--idle-timeout', dest='idle_timeout', type='float',
+                      default=60.0, help='Analyze the remaining modules in '
+                      'the coordinator when no worker has been connected for '
+                      'this many seconds (default %default)')
+    options, args = parser.parse_args()
+    authkey = os.environ.get('PYSTARCH_AUTHKEY') or None
+    if options.worker:
+        if authkey is None:
+            parser.error('set PYSTARCH_AUTHKEY to the key of the coordinator')
+        work(parse_address(options.worker), authkey)
+        return
+    if len(args) != 1:
+        parser.error('expected a project directory')
+    start = time.time()
+    try:
+        results, scheduler = coordinate(
+            args[0], parse_address(options.listen), authkey, options.local,
+            options.retries, options.timeout, options.idle_timeout)
+    except RuntimeError as error:
+        parser.error(str(error))
+    for _, output in results:
+        sys.stdout.write(output)
+    sys.stderr.write('-- analyzed {0} module(s) in {1:.0f} ms, {2} '
+                     'retried\n'.format(len(results),
+                                        (time.time() - start) * 1000,
+                                        scheduler.retried))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,205 @@
+"""
+Analysis cost profile. While a Profiler is installed, every visit of a
+statement or expression is timed, and the time spent in the node itself,
+without the nodes visited inside it, is charged to its source line and to
+the chain of function calls being evaluated when it was visited. Calls show
+up as frames named after the function, and imported modules as frames of
+their own, so a flamegraph shows which calls and imports a slow line
+causes.
+
+    python heatmap.py --folded out.folded --heat heat.json module.py
+    flamegraph.pl out.folded > out.svg
+    python annotate.py --heat heat.json project-directory output-directory
+
+The profiler replaces methods of the visitor classes, so it must not be used
+while other threads analyze.
+"""
+import os
+import sys
+import ast
+import json
+import time
+import optparse
+import visitor
+from main import analyze, __version__
+from backend import expr, FunctionEvaluator
+
+
+class Profiler(object):
+    def __init__(self):
+        self.lines = {}         # (filepath, line) -> [seconds, visits]
+        self.stacks = {}        # (frame, ..., filepath:line) -> [seconds, visits]
+        self._frames = []       # calls and imports being evaluated
+        self._files = []        # the file of each frame
+        self._nested = [0.0]    # time of the visits inside each open visit
+        self._originals = []
+
+    def _current_file(self):
+        return self._files[-1] if self._files else ''
+
+    def _timed(self, filepath, line, function, *args):
+        self._nested.append(0.0)
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.time() - start
+            own = elapsed - self._nested.pop()
+            self._nested[-1] += elapsed
+            entry = self.lines.setdefault((filepath, line), [0.0, 0])
+            entry[0] += own
+            entry[1] += 1
+            key = tuple(self._frames) + ('{0}:{1}'.format(filepath, line),)
+            entry = self.stacks.setdefault(key, [0.0, 0])
+            entry[0] += own
+            entry[1] += 1
+
+    def _framed(self, label, filepath, function, *args):
+        self._frames.append(label.replace(';', ':'))
+        self._files.append(filepath)
+        try:
+            return function(*args)
+        finally:
+            self._frames.pop()
+            self._files.pop()
+
+    def _patch(self, owner, name, replacement):
+        # owner's own attribute, which is missing for inherited methods
+        self._originals.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, replacement)
+
+    def install(self):
+        profiler = self
+        visit = visitor.ScopeVisitor.visit.__func__
+        lower = visitor.ScopeVisitor.lower.__func__
+        visit_expression = expr.visit_expression
+        evaluate = FunctionEvaluator.evaluate.__func__
+
+        def timed_handler(handler):
+            def run(scope_visitor, node):
+                return profiler._timed(scope_visitor._filepath, node.lineno,
+                                       handler, scope_visitor, node)
+            return run
+
+        def profiled_visit(scope_visitor, node):
+            filepath = scope_visitor._filepath
+            if isinstance(node, ast.Module):
+                return profiler._framed('<module> ' + filepath, filepath,
+                                        visit, scope_visitor, node)
+            if not hasattr(node, 'lineno'):
+                return visit(scope_visitor, node)
+            return profiler._timed(filepath, node.lineno, visit,
+                                   scope_visitor, node)
+
+        def profiled_lower(scope_visitor, body):
+            # the statements of function bodies are run by their handlers
+            # rather than through visit
+            return tuple((timed_handler(handler), stmt)
+                         for handler, stmt in lower(scope_visitor, body))
+
+        def profiled_visit_expression(node, expected_type, context,
+                                      warnings=None):
+            return profiler._timed(profiler._current_file(), node.lineno,
+                                   visit_expression, node, expected_type,
+                                   context, warnings)
+
+        def profiled_evaluate(evaluator, argument_scope):
+            # pylint: disable=protected-access
+            filepath = (getattr(evaluator._visitor, '_filepath', None)
+                        or profiler._current_file())
+            body = evaluator._body
+            first = body[0] if isinstance(body, list) and body else body
+            label = '{0} ({1}:{2})'.format(evaluator.name or '<lambda>',
+                                           filepath,
+                                           getattr(first, 'lineno', 0))
+            return profiler._framed(label, filepath, evaluate, evaluator,
+                                    argument_scope)
+
+        self._patch(visitor.ScopeVisitor, 'visit', profiled_visit)
+        self._patch(visitor.ScopeVisitor, 'lower', profiled_lower)
+        self._patch(expr, 'visit_expression', profiled_visit_expression)
+        self._patch(visitor, 'visit_expression', profiled_visit_expression)
+        self._patch(FunctionEvaluator, 'evaluate', profiled_evaluate)
+
+    def uninstall(self):
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
+    def write_folded(self, output, weight='time'):
+        """Writes the collapsed stack format, one line per chain of frames
+        with its own time in microseconds or its number of visits."""
+        for key in sorted(self.stacks):
+            seconds, visits = self.stacks[key]
+            value = visits if weight == 'visits' else int(seconds * 1e6)
+            if value > 0:
+                output.write('{0} {1}\n'.format(';'.join(key), value))
+
+    def heat(self):
+        """The per-line overlay read by annotate.py --heat."""
+        files = {}
+        for (filepath, line), (seconds, visits) in self.lines.items():
+            lines = files.setdefault(os.path.abspath(filepath), {})
+            lines[str(line)] = {'time': seconds, 'visits': visits}
+        return {'version': __version__, 'files': files}
+
+    def hottest(self, count):
+        return sorted(self.lines.items(), key=lambda item: -item[1][0])[:count]
+
+
+def profile(source, filepath):
+    profiler = Profiler()
+    profiler.install()
+    try:
+        analyze(source, filepath)
+    finally:
+        profiler.uninstall()
+    return profiler
+
+
+def source_line(filepath, line):
+    try:
+        with open(filepath) as source_file:
+            lines = source_file.read().splitlines()
+    except IOError:
+        return ''
+    return lines[line - 1].strip() if 0 < line <= len(lines) else ''
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] module.py')
+    parser.add_option('--folded', dest='folded', default=None,
+                      help='Write the collapsed stacks to this file')
+    parser.add_option('--weight', dest='weight', default='time',
+                      choices=['time', 'visits'], help='Weigh the collapsed '
+                      'stacks by own time in microseconds or by visits')
+    parser.add_option('--heat', dest='heat', default=None,
+                      help='Write the per-line heat overlay to this file')
+    parser.add_option('--top', dest='top', type='int', default=20,
+                      help='Number of lines to list')
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected a module')
+    with open(args[0]) as source_file:
+        source = source_file.read()
+    profiler = profile(source, args[0])
+    if options.folded:
+        with open(options.folded, 'w') as folded_file:
+            profiler.write_folded(folded_file, options.weight)
+    if options.heat:
+        with open(options.heat, 'w') as heat_file:
+            json.dump(profiler.heat(), heat_file, indent=1, sort_keys=True)
+    total = sum(seconds for seconds, _ in profiler.lines.values())
+    sys.stdout.write('{0:.1f} ms in {1} visits\n'.format(
+        total * 1000, sum(visits for _, visits in profiler.lines.values())))
+    for (filepath, line), (seconds, visits) in profiler.hottest(options.top):
+        sys.stdout.write('{0:8.2f} ms {1:7d}  {2}:{3}  {4}\n'.format(
+            seconds * 1000, visits, filepath, line,
+            source_line(filepath, line)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Function-granular incremental analysis. A Definitions object remembers the
+symbol and warnings produced by each top-level FunctionDef/ClassDef of one
+module so that the next analysis of the same module can reuse definitions
+whose source text and free-name dependencies are unchanged.
+"""
+import re
+import ast
+from backend import Scope, Instance
+from warning import NodeWarning
+
+
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+# a superset of the free names (it includes attributes, keywords and local
+# names), which only costs a few extra lookups in the context
+def free_names(source):
+    return set(IDENTIFIER.findall(source))
+
+
+def symbol_fingerprint(symbol):
+    if symbol is None:
+        return None
+    # str(Instance) only shows the class name, so also compare identity;
+    # unchanged imported modules are the same object between analyses
+    symbol_type = symbol.get_type()
+    identity = id(symbol_type) if isinstance(symbol_type, Instance) else None
+    return str(symbol), identity
+
+
+class Definition(object):
+    def __init__(self, node, source, dependencies, symbol, warnings):
+        self.node = node
+        self.source = source
+        self.dependencies = dependencies
+        self.symbol = symbol
+        self.warnings = warnings
+
+    def remap_warnings(self, node, filepath):
+        if len(self.warnings) == 0:
+            return []
+        # the source is identical, so walking both trees in the same order
+        # pairs up corresponding nodes that have the new line numbers
+        mapping = {id(old): new for old, new
+                   in zip(ast.walk(self.node), ast.walk(node))}
+        return [NodeWarning(filepath, mapping.get(id(w.node), w.node),
+                            w.category, w.details) for w in self.warnings]
+
+
+class Definitions(object):
+    def __init__(self):
+        # the module scope object is kept across analyses so that evaluators
+        # of reused functions resolve globals in the latest analysis
+        self.scope = Scope()
+        self._definitions = {}
+        self._next_definitions = {}
+        self._occurrences = {}
+        self._changed = set()
+        self.reused = 0
+        self.analyzed = 0
+
+    def begin(self):
+        self.scope.clear()
+        self._next_definitions = {}
+        self._occurrences = {}
+        self._changed = set()
+        self.reused = 0
+        self.analyzed = 0
+
+    def end(self):
+        self._definitions = self._next_definitions
+        self._next_definitions = {}
+
+    def _key(self, name):
+        occurrence = self._occurrences.get(name, 0)
+        self._occurrences[name] = occurrence + 1
+        return name, occurrence
+
+    def lookup(self, node, source, context):
+        """Returns (key, dependencies, definition) where definition is None
+        if the node has to be analyzed again."""
+        key = self._key(node.name)
+        dependencies = {name: symbol_fingerprint(context.get(name))
+                        for name in free_names(source)}
+        definition = self._definitions.get(key)
+        if (definition is None
+                or definition.source != source
+                or definition.dependencies != dependencies
+                or any(name in self._changed for name in dependencies)):
+            return key, dependencies, None
+        self._next_definitions[key] = definition
+        self.reused += 1
+        return key, dependencies, definition
+
+    def store(self, key, node, source, dependencies, symbol, warnings):
+        self._next_definitions[key] = Definition(
+            node, source, dependencies, symbol, warnings)
+        self._changed.add(node.name)
+        self.analyzed += 1
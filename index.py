@@ -0,0 +1,224 @@
+"""
+Project-wide symbol index. While a module is analyzed, a Recorder collects
+the definitions and uses seen on the first pass through every scope (the
+same pass that produces warnings), and the rows are written to a SQLite
+database in one transaction per module. Queries read only the database.
+"""
+import os
+import sys
+import ast
+import sqlite3
+import optparse
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS definitions (
+    file_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    type TEXT,
+    signature TEXT
+);
+CREATE TABLE IF NOT EXISTS uses (
+    file_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS definitions_name ON definitions (name);
+CREATE INDEX IF NOT EXISTS definitions_file ON definitions (file_id);
+CREATE INDEX IF NOT EXISTS uses_name ON uses (name);
+CREATE INDEX IF NOT EXISTS uses_file ON uses (file_id);
+'''
+
+
+class Recorder(object):
+    """Collects rows for one module. scope() returns a recorder for a nested
+    scope that appends to the same rows."""
+    def __init__(self, scope='', definitions=None, uses=None):
+        self._scope = scope
+        self.definitions = [] if definitions is None else definitions
+        self.uses = [] if uses is None else uses
+
+    def scope(self, name):
+        scope = self._scope + '.' + name if self._scope else name
+        return Recorder(scope, self.definitions, self.uses)
+
+    def define(self, name, kind, node, type_, signature=None):
+        self.definitions.append((self._scope, name, kind, node.lineno,
+                                 getattr(node, 'col_offset', 0),
+                                 None if type_ is None else str(type_),
+                                 signature))
+
+    def use(self, name, kind, node, type_=None):
+        self.uses.append((self._scope, name, kind, node.lineno,
+                          node.col_offset,
+                          None if type_ is None else str(type_)))
+
+    def use_names(self, expression, context):
+        for node in ast.walk(expression):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                self.use(node.id, 'name', node, context.get_type(node.id))
+            elif isinstance(node, ast.Attribute):
+                self.use(node.attr, 'attribute', node)
+
+
+class Index(object):
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def file_key(self, filepath):
+        row = self._connection.execute(
+            'SELECT key FROM files WHERE path = ?', (filepath,)).fetchone()
+        return row[0] if row else None
+
+    def write_module(self, filepath, key, recorder):
+        with self._connection:
+            self._remove(filepath)
+            cursor = self._connection.execute(
+                'INSERT INTO files (path, key) VALUES (?, ?)', (filepath, key))
+            file_id = cursor.lastrowid
+            self._connection.executemany(
+                'INSERT INTO definitions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(file_id,) + row for row in recorder.definitions])
+            self._connection.executemany(
+                'INSERT INTO uses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(file_id,) + row for row in recorder.uses])
+
+    def remove_missing(self, filepaths):
+        existing = set(filepaths)
+        with self._connection:
+            for (path,) in self._connection.execute(
+                    'SELECT path FROM files').fetchall():
+                if path not in existing:
+                    self._remove(path)
+
+    def _remove(self, filepath):
+        row = self._connection.execute(
+            'SELECT id FROM files WHERE path = ?', (filepath,)).fetchone()
+        if row is None:
+            return
+        for table in ['definitions', 'uses']:
+            self._connection.execute(
+                'DELETE FROM {0} WHERE file_id = ?'.format(table), row)
+        self._connection.execute('DELETE FROM files WHERE id = ?', row)
+
+    def _query(self, table, columns, name, scope):
+        sql = ('SELECT files.path, {0}.line, {0}.col, {0}.scope, {0}.kind, '
+               '{1} FROM {0} JOIN files ON files.id = {0}.file_id '
+               'WHERE {0}.name = ?').format(table, columns)
+        arguments = [name]
+        if scope is not None:
+            sql += ' AND {0}.scope = ?'.format(table)
+            arguments.append(scope)
+        sql += ' ORDER BY files.path, {0}.line, {0}.col'.format(table)
+        return self._connection.execute(sql, arguments).fetchall()
+
+    def definitions(self, name, scope=None):
+        return self._query('definitions',
+                           'definitions.type, definitions.signature',
+                           name, scope)
+
+    def uses(self, name, scope=None):
+        return self._query('uses', 'uses.type, NULL', name, scope)
+
+
+def index_project(root, database):
+    """Analyzes every module under root that changed since the last run, or
+    imports a module that changed, and writes its definitions and uses to
+    the database."""
+    from main import analyze, cache_key, register_summary
+    from watch import Project, project_files
+    project = Project(root)
+    index = Index(database)
+    filepaths = sorted(project_files(root))
+    sources = {}
+    changed = []
+    analyzed = 0
+    try:
+        for filepath in filepaths:
+            with open(filepath) as source_file:
+                source = source_file.read()
+            try:
+                tree = ast.parse(source, filepath)
+            except SyntaxError as error:
+                sys.stderr.write('{0}:{1} syntax-error ({2})\n'.format(
+                    filepath, error.lineno, error.msg))
+                continue
+            project.update_dependencies(filepath, tree)
+            key = cache_key(filepath, source)
+            sources[filepath] = source, key
+            if index.file_key(filepath) != key:
+                changed.append(filepath)
+        # importers come after the modules they import, which are analyzed
+        # again rather than read from summaries of their old sources
+        for filepath in project.forget_dependents(changed):
+            source, key = sources[filepath]
+            recorder = Recorder()
+            try:
+                scope, _, _ = analyze(source, filepath, imported=[],
+                                      recorder=recorder)
+                register_summary(filepath, source, scope)
+            except Exception as error:  # pylint: disable=broad-except
+                # keep indexing the rest of the project; the module keeps
+                # its old rows and is retried on the next run
+                sys.stderr.write('{0}: analysis failed ({1}: {2})\n'.format(
+                    filepath, error.__class__.__name__, error))
+                continue
+            index.write_module(filepath, key, recorder)
+            analyzed += 1
+        index.remove_missing(sources)
+    finally:
+        index.close()
+    return analyzed, len(filepaths)
+
+
+def show_row(row):
+    path, line, col, scope, kind, type_, _ = row
+    return '{0}:{1}:{2} {3} {4} {5}'.format(
+        path, line, col, scope or '<module>', kind, type_ or '').rstrip()
+
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog [options] database name\n\n'
+              'Looks up a name in an index written by main.py --index')
+    parser.add_option('-u', '--uses', dest='uses', action='store_true',
+                      default=False, help='List uses instead of definitions')
+    parser.add_option('-s', '--scope', dest='scope', default=None,
+                      help='Only match this scope, like "Class.method"; '
+                      'use "" for the module scope')
+    options, args = parser.parse_args()
+    if len(args) != 2:
+        parser.error('expected a database and a name')
+    database, name = args
+    if not os.path.exists(database):
+        parser.error('no index at ' + database)
+    index = Index(database)
+    try:
+        rows = (index.uses(name, options.scope) if options.uses
+                else index.definitions(name, options.scope))
+    finally:
+        index.close()
+    for row in rows:
+        sys.stdout.write(show_row(row) + '\n')
+    sys.exit(0 if rows else 1)
+
+
+if __name__ == '__main__':
+    main()
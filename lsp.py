@@ -0,0 +1,340 @@
+"""
+Language Server Protocol front-end over stdio. Documents are analyzed in a
+single background thread after a short debounce delay, and results for a
+document version that has since been superseded are discarded.
+"""
+import re
+import sys
+import ast
+import json
+import time
+import threading
+from urllib import url2pathname
+from urlparse import urlparse
+from main import analyze, __version__
+from warning import show_node
+from backend import Scope
+from incremental import Definitions
+from cancellation import CancellationToken, Cancelled
+
+
+WORD = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+SEVERITY_WARNING = 2
+SYNC_FULL = 1
+
+
+def uri_to_filepath(uri):
+    parsed = urlparse(uri)
+    return url2pathname(parsed.path) if parsed.scheme == 'file' else uri
+
+
+def word_at(text, line, character):
+    lines = text.splitlines()
+    if not 0 <= line < len(lines):
+        return None
+    for match in WORD.finditer(lines[line]):
+        if match.start() <= character <= match.end():
+            return match.group()
+    return None
+
+
+def warning_range(warning, lines):
+    node = warning.node
+    line = node.lineno - 1
+    start = getattr(node, 'col_offset', 0)
+    if isinstance(node, ast.Name):
+        end = start + len(node.id)
+    else:
+        end = len(lines[line]) if 0 <= line < len(lines) else start
+    return {'start': {'line': line, 'character': start},
+            'end': {'line': line, 'character': end}}
+
+
+def diagnostic(warning, lines):
+    details = ' ({0})'.format(warning.details) if warning.details else ''
+    return {
+        'range': warning_range(warning, lines),
+        'severity': SEVERITY_WARNING,
+        'source': 'pystarch',
+        'code': warning.category,
+        'message': '{0} "{1}"{2}'.format(
+            warning.category, show_node(warning.node), details),
+    }
+
+
+def syntax_error_diagnostic(error):
+    line = max(0, (error.lineno or 1) - 1)
+    character = max(0, (error.offset or 1) - 1)
+    position = {'line': line, 'character': character}
+    return {'range': {'start': position, 'end': position},
+            'severity': 1, 'source': 'pystarch', 'code': 'syntax-error',
+            'message': error.msg}
+
+
+class Document(object):
+    def __init__(self, uri, text, version):
+        self.uri = uri
+        self.filepath = uri_to_filepath(uri)
+        self.text = text
+        self.version = version
+        self.scope = None
+
+
+class Connection(object):
+    def __init__(self, infile, outfile):
+        self._infile = infile
+        self._outfile = outfile
+        self._lock = threading.Lock()
+
+    def read(self):
+        length = None
+        while True:
+            line = self._infile.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        if length is None:
+            return None
+        return json.loads(self._infile.read(length))
+
+    def write(self, message):
+        message['jsonrpc'] = '2.0'
+        body = json.dumps(message)
+        with self._lock:
+            self._outfile.write('Content-Length: {0}\r\n\r\n{1}'.format(
+                len(body), body))
+            self._outfile.flush()
+
+    def notify(self, method, params):
+        self.write({'method': method, 'params': params})
+
+    def respond(self, request_id, result=None, error=None):
+        message = {'id': request_id}
+        if error is not None:
+            message['error'] = error
+        else:
+            message['result'] = result
+        self.write(message)
+
+
+class Analyzer(threading.Thread):
+    """Runs analyses one at a time. A document that is edited again before
+    its analysis starts is only analyzed once, after the latest edit."""
+    def __init__(self, server, delay):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._server = server
+        self._delay = delay
+        self._due = {}
+        self._condition = threading.Condition()
+
+    def schedule(self, uri):
+        with self._condition:
+            self._due[uri] = time.time() + self._delay
+            self._condition.notify()
+
+    def forget(self, uri):
+        with self._condition:
+            self._due.pop(uri, None)
+
+    def _next_uri(self):
+        with self._condition:
+            while True:
+                if self._due:
+                    uri = min(self._due, key=self._due.get)
+                    wait = self._due[uri] - time.time()
+                    if wait <= 0:
+                        del self._due[uri]
+                        return uri
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def run(self):
+        while True:
+            self._server.analyze_document(self._next_uri())
+
+
+class Server(object):
+    def __init__(self, connection, delay=0.2):
+        self._connection = connection
+        self._documents = {}
+        self._definitions = {}
+        self._cancellations = {}
+        self._lock = threading.Lock()
+        self._analyzer = Analyzer(self, delay)
+        self._shutdown = False
+        self._handlers = {
+            'initialize': self.initialize,
+            'shutdown': self.shutdown,
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didSave': self.did_save,
+            'textDocument/didClose': self.did_close,
+            'textDocument/hover': self.hover,
+        }
+
+    def cancel(self, uri):
+        # stops an analysis of an older version of the document at its next
+        # top-level statement; the caller has scheduled a new one
+        with self._lock:
+            cancellation = self._cancellations.pop(uri, None)
+        if cancellation is not None:
+            cancellation.cancel()
+
+    def analyze_document(self, uri):
+        cancellation = CancellationToken()
+        with self._lock:
+            document = self._documents.get(uri)
+            if document is None:
+                return
+            document = Document(uri, document.text, document.version)
+            self._cancellations[uri] = cancellation
+        lines = document.text.splitlines()
+        # only the analyzer thread touches definitions, so no lock is needed
+        definitions = self._definitions.setdefault(uri, Definitions())
+        try:
+            scope, warnings, _ = analyze(document.text, document.filepath,
+                                         imported=[], definitions=definitions,
+                                         cancellation=cancellation)
+            diagnostics = [diagnostic(w, lines) for w in warnings]
+            # the module scope is reused by the next analysis, so hover
+            # reads from a copy
+            scope_copy = Scope()
+            scope_copy.merge(scope)
+            scope = scope_copy
+        except Cancelled:
+            return
+        except SyntaxError as error:
+            scope = None
+            diagnostics = [syntax_error_diagnostic(error)]
+        except Exception as error:  # pylint: disable=broad-except
+            self._connection.notify('window/logMessage', {
+                'type': 1, 'message': 'pystarch failed on {0}: {1}'.format(
+                    document.filepath, error)})
+            return
+        with self._lock:
+            if self._cancellations.get(uri) is cancellation:
+                del self._cancellations[uri]
+            current = self._documents.get(uri)
+            if current is None or current.version != document.version:
+                return      # superseded by a newer edit, drop the result
+            if scope is not None:
+                current.scope = scope
+        self._connection.notify('textDocument/publishDiagnostics', {
+            'uri': uri, 'diagnostics': diagnostics})
+
+    def initialize(self, params):
+        _ = params
+        return {
+            'capabilities': {
+                'textDocumentSync': SYNC_FULL,
+                'hoverProvider': True,
+            },
+            'serverInfo': {'name': 'pystarch', 'version': __version__},
+        }
+
+    def shutdown(self, params):
+        _ = params
+        self._shutdown = True
+        return None
+
+    def did_open(self, params):
+        item = params['textDocument']
+        with self._lock:
+            self._documents[item['uri']] = Document(
+                item['uri'], item['text'], item.get('version'))
+        self._analyzer.schedule(item['uri'])
+
+    def did_change(self, params):
+        uri = params['textDocument']['uri']
+        changes = params['contentChanges']
+        if not changes:
+            return
+        with self._lock:
+            document = self._documents.get(uri)
+            if document is None:
+                return
+            document.text = changes[-1]['text']
+            document.version = params['textDocument'].get('version')
+        self.cancel(uri)
+        self._analyzer.schedule(uri)
+
+    def did_save(self, params):
+        self._analyzer.schedule(params['textDocument']['uri'])
+
+    def did_close(self, params):
+        uri = params['textDocument']['uri']
+        with self._lock:
+            self._documents.pop(uri, None)
+        self.cancel(uri)
+        self._analyzer.forget(uri)
+        self._connection.notify('textDocument/publishDiagnostics', {
+            'uri': uri, 'diagnostics': []})
+
+    def hover(self, params):
+        uri = params['textDocument']['uri']
+        position = params['position']
+        with self._lock:
+            document = self._documents.get(uri)
+            if document is None or document.scope is None:
+                return None
+            name = word_at(document.text, position['line'],
+                           position['character'])
+            symbol = document.scope.get(name) if name else None
+            if symbol is None:
+                return None
+            return {'contents': {'kind': 'plaintext',
+                                 'value': '{0} {1}'.format(name, symbol)}}
+
+    def handle(self, message):
+        method = message.get('method')
+        handler = self._handlers.get(method)
+        if 'id' not in message:
+            if handler is not None:
+                try:
+                    handler(message.get('params') or {})
+                except Exception as error:  # pylint: disable=broad-except
+                    self._log_failure(method, error)
+            return
+        if handler is None:
+            self._connection.respond(message['id'], error={
+                'code': -32601, 'message': 'Method not found: ' + str(method)})
+            return
+        try:
+            result = handler(message.get('params') or {})
+        except Exception as error:  # pylint: disable=broad-except
+            # the server keeps serving the other requests
+            self._log_failure(method, error)
+            self._connection.respond(message['id'], error={
+                'code': -32603, 'message': 'Internal error in {0}: {1}'.format(
+                    method, error)})
+            return
+        self._connection.respond(message['id'], result)
+
+    def _log_failure(self, method, error):
+        self._connection.notify('window/logMessage', {
+            'type': 1, 'message': 'pystarch failed on {0}: {1}'.format(
+                method, error)})
+
+    def serve(self):
+        self._analyzer.start()
+        while True:
+            message = self._connection.read()
+            if message is None or message.get('method') == 'exit':
+                return 0 if self._shutdown else 1
+            self.handle(message)
+
+
+def main():
+    connection = Connection(sys.stdin, sys.stdout)
+    sys.exit(Server(connection).serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,30 @@
 import os
 import sys
 import ast
-import imp
-import marshal
-import meta
 import cPickle as pickle
 import optparse
-from hashlib import sha256
+from cStringIO import StringIO
+from thread import allocate_lock
+import warning
 from visitor import ScopeVisitor
-from backend import Scope, Symbol, Instance, Context, Unknown
+from backend import Scope, Symbol, Instance, Context, Unknown, expr, \
+    evaluate, NullWarnings, compact_functions, forget_calls
+# meta, marshal, imp, hashlib and the summary store are imported on first
+# use, which keeps startup fast for single files without imports
 
 
 NAME = 'strictpy'
-__version__ = '1.0.0'
+__version__ = '1.4.0'
+CACHE_DIR = os.path.join(os.sep, 'var', 'cache', NAME, __version__)
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+STUB_SUMMARIES_PATH = os.path.join(STUBS_DIR, 'summaries.pickle')
 
 
 def pyc_source(pyc_contents):
+    import marshal
+    import meta
     code_section = pyc_contents[8:]
-    code = marshal.load(code_section)
+    code = marshal.loads(code_section)
     return meta.dump_python_source(meta.decompile(code))
 
 
@@ -29,6 +36,7 @@ def get_module_source_path(import_name, current_filepath):
         source_dir = os.path.abspath(os.path.dirname(current_filepath))
         # sys.path includes PYTHONPATH env var
         python_paths = [source_dir] + sys.path[1:]
+        import imp
         try:
             module_file, module_path, _ = imp.find_module(
                 import_name, python_paths)
@@ -54,9 +62,140 @@ def get_module_source_path(import_name, current_filepath):
     return module_path, False
 
 
+# once a module is analyzed, the functions in its summary drop their bodies
+# and the contexts they were analyzed in, see backend.CompactEvaluator
+COMPACT_SUMMARIES = True
+
+
+def module_summary(scope, filepath, source):
+    if COMPACT_SUMMARIES:
+        compact_functions(scope, filepath, source)
+    return Instance('object', scope)
+
+
+# the resident memory above which the least recently used module summaries
+# are moved to the summary store, in bytes; None keeps every summary
+MAX_MEMORY = None
+EVICT_FRACTION = 4      # a quarter of the summaries are evicted at a time
+
+
+def resident_memory():
+    """The resident set size of the process in bytes, or None where
+    /proc/self/statm does not exist."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (IOError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class SummaryCache(object):
+    """Module summaries by filepath as (cache key, module) pairs, shared by
+    all threads. When the process grows past MAX_MEMORY, the least recently
+    used summaries are written to the summary store and dropped;
+    import_module reads them back by their cache key on the next import."""
+    def __init__(self):
+        self._entries = {}      # filepath -> [last use, cache key, module]
+        self._lock = allocate_lock()
+        self._clock = 0
+        self._capacity = None
+        self._high_water = 0
+        self.evicted = 0
+
+    def get(self, filepath, default=None):
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry is None:
+                return default
+            self._clock += 1
+            entry[0] = self._clock
+            return entry[1], entry[2]
+
+    def __setitem__(self, filepath, summary):
+        with self._lock:
+            self._clock += 1
+            self._entries[filepath] = [self._clock, summary[0], summary[1]]
+            if MAX_MEMORY is not None:
+                self._limit_memory()
+
+    def pop(self, filepath, default=None):
+        with self._lock:
+            entry = self._entries.pop(filepath, None)
+        return default if entry is None else (entry[1], entry[2])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, filepath):
+        return filepath in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, count):
+        store = summary_store()
+        by_age = sorted(self._entries.items(), key=lambda item: item[1][0])
+        for filepath, (_, key, module) in by_age[:count]:
+            if key not in store:
+                try:
+                    write_cache(key, module)
+                except RuntimeError:
+                    pass    # too deeply nested to pickle: analyzed again
+            del self._entries[filepath]
+            self.evicted += 1
+
+    def _limit_memory(self):
+        if self._capacity is not None and len(self._entries) > self._capacity:
+            self._evict(len(self._entries) - self._capacity)
+        memory = resident_memory()
+        if memory is None or memory <= max(MAX_MEMORY, self._high_water):
+            return
+        # freed memory is reused by the allocator rather than returned to
+        # the system, so the process does not shrink; instead the number of
+        # summaries is capped from now on, and lowered whenever the process
+        # grows past the size it had after the last eviction
+        import gc
+        self._capacity = len(self._entries) * (EVICT_FRACTION - 1) // \
+            EVICT_FRACTION
+        self._evict(len(self._entries) - self._capacity)
+        # summaries reference each other and their contexts in cycles
+        gc.collect()
+        self._high_water = resident_memory()
+
+
+# import resolution and module summaries are kept in memory for the life of
+# the process so that repeated imports (and watch mode) stay warm
+_resolved_modules = {}
+_module_summaries = SummaryCache()
+_builtin_context = None
+_stub_summaries = None
+_summary_store = None
+
+
+def resolve_module(import_name, current_filepath):
+    if import_name is None:
+        return get_module_source_path(import_name, current_filepath)
+    key = (import_name, os.path.abspath(os.path.dirname(current_filepath)))
+    if key not in _resolved_modules:
+        try:
+            _resolved_modules[key] = get_module_source_path(
+                import_name, current_filepath)
+        except RuntimeError as error:
+            _resolved_modules[key] = error
+    resolved = _resolved_modules[key]
+    if isinstance(resolved, RuntimeError):
+        raise resolved
+    return resolved
+
+
+def clear_resolved_modules():
+    _resolved_modules.clear()
+
+
 def import_source(import_name, current_filepath):
-    module_path, is_package = get_module_source_path(
-        import_name, current_filepath)
+    module_path, is_package = resolve_module(import_name, current_filepath)
     if module_path.endswith('.py'):
         with open(module_path) as module_file:
             return module_file.read(), module_path, is_package
@@ -72,47 +211,171 @@ def import_source(import_name, current_filepath):
         raise RuntimeError('Unrecognized extension: ' + module_path)
 
 
-def import_module(name, current_filepath, imported, warn):
+def cache_key(filepath, source):
+    from hashlib import sha256
+    # literal sampling and the static value limit change the summaries
+    settings = '{0}~{1}'.format(expr.LITERAL_SAMPLE_SIZE,
+                                evaluate.STATIC_VALUE_LIMIT)
+    return sha256(filepath + '~' + settings + '~' + source).hexdigest()
+
+
+def summary_store():
+    global _summary_store       # pylint: disable=global-statement
+    if _summary_store is None or _summary_store.directory != CACHE_DIR:
+        from store import SummaryStore
+        _summary_store = SummaryStore(CACHE_DIR)
+    return _summary_store
+
+
+def read_cache(key):
+    blob = summary_store().get(key)
+    # cStringIO reads the buffer in place, so the blob is never copied
+    return None if blob is None else pickle.load(StringIO(blob))
+
+
+def write_cache(key, module):
+    summary_store().put(key, pickle.dumps(module, pickle.HIGHEST_PROTOCOL))
+
+
+def stub_names():
+    return sorted(os.path.splitext(x)[0] for x in os.listdir(STUBS_DIR)
+                  if x.endswith('.py'))
+
+
+def stubs_digest():
+    from hashlib import sha256
+    digest = sha256(__version__)
+    for name in stub_names():
+        with open(os.path.join(STUBS_DIR, name + '.py')) as stub_file:
+            digest.update(name + '~' + stub_file.read())
+    return digest.hexdigest()
+
+
+def analyze_stub(name):
+    filepath = os.path.join(STUBS_DIR, name + '.py')
+    with open(filepath) as stub_file:
+        source = stub_file.read()
+    scope, _, _ = analyze(source, filepath, imported=[filepath],
+                          inference_only=True)
+    return module_summary(scope, filepath, source)
+
+
+def load_stub_summaries():
+    # summaries built for a different version or from different stub sources
+    # are ignored and the stubs are analyzed lazily instead
+    if os.path.exists(STUB_SUMMARIES_PATH):
+        with open(STUB_SUMMARIES_PATH, 'rb') as summaries_file:
+            summaries = pickle.load(summaries_file)
+        if summaries.get('digest') == stubs_digest():
+            return summaries['modules']
+    return {}
+
+
+def build_stub_summaries():
+    global _stub_summaries      # pylint: disable=global-statement
+    _stub_summaries = {}
+    for name in stub_names():
+        stub_module(name, os.path.join(STUBS_DIR, name + '.py'))
+    summaries = {'version': __version__, 'digest': stubs_digest(),
+                 'modules': _stub_summaries}
+    temp_filepath = '{0}.{1}.tmp'.format(STUB_SUMMARIES_PATH, os.getpid())
+    with open(temp_filepath, 'wb') as summaries_file:
+        pickle.dump(summaries, summaries_file, pickle.HIGHEST_PROTOCOL)
+    os.rename(temp_filepath, STUB_SUMMARIES_PATH)
+    return sorted(_stub_summaries)
+
+
+def stub_module(name, current_filepath):
+    """Returns the stub summary of a standard library module, or None if
+    there is no stub or a module of the same name next to the importing file
+    would shadow it."""
+    global _stub_summaries      # pylint: disable=global-statement
+    if name is None or not os.path.exists(
+            os.path.join(STUBS_DIR, name + '.py')):
+        return None
+    source_dir = os.path.abspath(os.path.dirname(current_filepath))
+    if source_dir != STUBS_DIR and (
+            os.path.exists(os.path.join(source_dir, name + '.py'))
+            or os.path.isdir(os.path.join(source_dir, name))):
+        return None
+    if _stub_summaries is None:
+        _stub_summaries = load_stub_summaries()
+    if name not in _stub_summaries:
+        _stub_summaries[name] = analyze_stub(name)
+    return _stub_summaries[name]
+
+
+def import_module(name, current_filepath, session, warn, absolute=False):
+    if absolute:
+        module = stub_module(name, current_filepath)
+        if module is not None:
+            return module, os.path.join(STUBS_DIR, name + '.py'), False
     try:
         source, filepath, is_package = import_source(name, current_filepath)
     except RuntimeError as error:
         warn('import-failed', name + ' ' + current_filepath + '\n' + str(error))
         return Unknown(), current_filepath, False
 
-    cache_filename = sha256(filepath + '~' + source).hexdigest()
-    cache_filepath = os.path.join(os.sep, 'var', 'cache', NAME,
-                                  __version__, cache_filename)
-
-    if os.path.exists(cache_filepath):
-        with open(cache_filepath, 'rb') as cache_file:
-            return pickle.load(cache_file), filepath, is_package
-    elif filepath in imported:
-        #i = imported.index(filepath)
-        #paths = ' -> '.join(imported[i:] + [filepath])
+    key = cache_key(filepath, source)
+    summary = _module_summaries.get(filepath)
+    if summary is not None and summary[0] == key:
+        return summary[1], filepath, is_package
+    module = read_cache(key)
+    if module is not None:
+        _module_summaries[filepath] = (key, module)
+        return module, filepath, is_package
+    elif filepath in session.imported:
+        #i = session.imported.index(filepath)
+        #paths = ' -> '.join(session.imported[i:] + [filepath])
         #print('CIRCULAR: ' + paths)
         return Instance('object', Scope()), filepath, is_package
     else:
-        imported.append(filepath)
-        scope, _, _ = analyze(source, filepath, imported=imported)
-        module = Instance('object', scope)
-        with open(cache_filepath, 'wb') as cache_file:
-            pickle.dump(module, cache_file, pickle.HIGHEST_PROTOCOL)
+        session.imported.append(filepath)
+        # the warnings of dependencies are never shown
+        scope, _, _ = session.dependency().analyze(source, filepath)
+        module = module_summary(scope, filepath, source)
+        write_cache(key, module)
+        _module_summaries[filepath] = (key, module)
         return module, filepath, is_package
 
 
+def register_summary(filepath, source, scope):
+    """Makes the scope of a module analyzed as filepath the summary that
+    later imports of the module use."""
+    absolute_path = os.path.abspath(filepath)
+    _module_summaries[absolute_path] = (cache_key(absolute_path, source),
+                                        module_summary(scope, filepath,
+                                                       source))
+
+
+def forget_module(filepath):
+    """Drop the in-memory and on-disk summaries of a module so that the next
+    import analyzes it again. Dependents must be forgotten too because their
+    cache keys only cover their own source."""
+    keys = set()
+    summary = _module_summaries.pop(filepath, None)
+    if summary is not None:
+        keys.add(summary[0])
+    if os.path.exists(filepath):
+        with open(filepath) as module_file:
+            keys.add(cache_key(filepath, module_file.read()))
+    for key in keys:
+        summary_store().delete(key)
+
+
 def import_chain(fully_qualified_name, asname, import_scope, current_filepath,
-                 imported, warn):
+                 session, warn):
     scope = import_scope
     filepath = current_filepath
     is_package = True
     names = fully_qualified_name.split('.') if fully_qualified_name else [None]
-    for name in names:
+    for index, name in enumerate(names):
         if scope is None:
             warn('import-error', fully_qualified_name)
             return Unknown()
         if is_package:
             import_type, filepath, is_package = import_module(
-                name, filepath, imported, warn)
+                name, filepath, session, warn, absolute=index == 0)
             if asname is None:
                 scope.add(Symbol(name, import_type))
             scope = (import_type.attributes if isinstance(import_type, Instance)
@@ -134,34 +397,90 @@ def get_path_for_level(filepath, level):
 
 
 class ModuleVisitor(ScopeVisitor):
+    def __init__(self, filepath='', context=None, session=None,
+                 warnings=None, definitions=None, source=None,
+                 recorder=None):
+        ScopeVisitor.__init__(self, filepath, context, warnings, recorder)
+        self._session = session if session is not None else Session()
+        self._definitions = definitions
+        self._source_lines = source.splitlines() if source else []
 
     def visit_Module(self, node):
-        self.begin_scope()
-        self.generic_visit(node)
+        if self._definitions is None:
+            self.begin_scope()
+            for stmt in node.body:
+                self.check_cancelled()
+                self.visit(stmt)
+        else:
+            self._definitions.begin()
+            self.begin_scope(self._definitions.scope)
+            ends = [stmt.lineno - 1 for stmt in node.body[1:]]
+            for stmt, end in zip(node.body, ends + [None]):
+                self.check_cancelled()
+                if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+                    lines = self._source_lines[stmt.lineno - 1:end]
+                    self.visit_definition(stmt, '\n'.join(lines).rstrip())
+                else:
+                    self.visit(stmt)
+            self._definitions.end()
         # don't end scope so that caller can see what is in the scope
 
+    def check_cancelled(self):
+        if self._session.cancellation is not None:
+            self._session.cancellation.check()
+
+    def visit_definition(self, node, source):
+        key, dependencies, definition = self._definitions.lookup(
+            node, source, self._context)
+        if definition is not None:
+            # its functions may have been compacted since, and their calls
+            # depend on the definitions around them until the module is
+            # compacted again
+            forget_calls(definition.symbol.get_type(), self._filepath)
+            self._context.add(definition.symbol)
+            for remapped in definition.remap_warnings(node, self._filepath):
+                self._warnings.add(remapped)
+            return
+        first_warning = len(self._warnings)
+        self.visit(node)
+        self._definitions.store(key, node, source, dependencies,
+                                self._context.get(node.name),
+                                self._warnings[first_warning:])
+
     def visit_Import(self, node):
         scope = self._context.get_top_scope()
         warn = lambda category, details: self._warnings.warn(
                                             node, category, details)
         for alias in node.names:
             import_chain(alias.name, alias.asname, scope, self._filepath,
-                         self._imported, warn)
+                         self._session, warn)
+            if self._recorder is not None:
+                name = alias.asname or alias.name.split('.')[0]
+                self._recorder.define(name, 'import', node,
+                                      scope.get_type(name))
 
     def visit_ImportFrom(self, node):
         filepath = get_path_for_level(self._filepath, node.level)
         parts = node.module.split('.') if node.module else [None]
         warn = lambda category, details: self._warnings.warn(
                                             node, category, details)
-        for part in parts:
+        is_package = True
+        for index, part in enumerate(parts):
+            if not is_package:
+                # a submodule that is an attribute, like os.path
+                import_type = (import_type.attributes.get_type(part)
+                               if isinstance(import_type, Instance)
+                               else None) or Unknown()
+                continue
             import_type, filepath, is_package = import_module(
-                part, filepath, self._imported, warn)
+                part, filepath, self._session, warn,
+                absolute=index == 0 and node.level == 0)
 
         for alias in node.names:
             symbol_name = alias.asname or alias.name
             if is_package:
                 symbol_type, _, _ = import_module(alias.name, filepath,
-                                                  self._imported, warn)
+                                                  self._session, warn)
             else:
                 if isinstance(import_type, Instance):
                     symbol_type = import_type.attributes.get_type(alias.name)
@@ -171,27 +490,143 @@ class ModuleVisitor(ScopeVisitor):
                 else:
                     symbol_type = Unknown()
             self._context.add(Symbol(symbol_name, symbol_type))
+            if self._recorder is not None:
+                self._recorder.define(symbol_name, 'import', node,
+                                      symbol_type)
 
 
-def builtin_context():
-    filename = 'builtins.py'
-    context = Context()
-    this_dir = os.path.dirname(os.path.abspath(__file__))
-    with open(os.path.join(this_dir, filename)) as builtins_file:
-        source = builtins_file.read()
-    analyze(source, filename, context)
-    return context
+def load_builtin_snapshot(source):
+    snapshot_path = os.path.join(CACHE_DIR, 'builtins.pickle')
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            snapshot_source, context = pickle.load(snapshot_file)
+    except (IOError, EOFError, pickle.UnpicklingError):
+        return None
+    return context if snapshot_source == source else None
 
 
-def analyze(source, filepath=None, context=None, imported=[]):
-    tree = ast.parse(source, filepath)
-    visitor = ModuleVisitor(filepath, context or builtin_context(), imported)
-    visitor.visit(tree)
-    return visitor.report()
+def write_builtin_snapshot(source, context):
+    from store import replace_file
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        replace_file(os.path.join(CACHE_DIR, 'builtins.pickle'),
+                     pickle.dumps((source, context), pickle.HIGHEST_PROTOCOL))
+    except (IOError, OSError):
+        pass    # without a writable cache the builtins are analyzed each time
 
 
-def analysis(source, filepath=None, context=None, show_types=False):
-    scope, warnings, _ = analyze(source, filepath, context)
+def builtin_context():
+    # the builtins are analyzed once per process; each caller gets a copy so
+    # that the scopes it begins are not seen by anyone else
+    global _builtin_context     # pylint: disable=global-statement
+    if _builtin_context is None:
+        filename = 'builtins.py'
+        this_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(this_dir, filename)) as builtins_file:
+            source = builtins_file.read()
+        # the snapshot stores the source it was analyzed from, so an edited
+        # builtins.py is never answered from a stale snapshot
+        context = load_builtin_snapshot(source)
+        if context is None:
+            context = Context()
+            analyze(source, filename, context, inference_only=True)
+            write_builtin_snapshot(source, context)
+        _builtin_context = context
+    return _builtin_context.copy()
+
+
+class Session(object):
+    """The state of one analysis: the modules imported so far, to stop at
+    import cycles, the cancellation token, whether warnings are checked and
+    the (enabled, disabled) warning categories, by default the ones set from
+    the command line. Everything else an analysis changes is created for it,
+    and the caches it shares with other analyses (the builtins, stub and
+    module summaries and import resolutions) are only added to, so analyses
+    in separate sessions can run in parallel threads. Literal sampling, the
+    static value limit and MAX_MEMORY are process-wide, because they change
+    or bound those shared summaries."""
+    def __init__(self, imported=None, cancellation=None,
+                 inference_only=False, categories=None):
+        self.imported = [] if imported is None else imported
+        self.cancellation = cancellation
+        self.inference_only = inference_only
+        self.categories = categories or (warning.ENABLED_CATEGORIES,
+                                         warning.DISABLED_CATEGORIES)
+
+    def dependency(self):
+        """The session for analyzing a module that this one imports."""
+        return Session(self.imported, self.cancellation, inference_only=True,
+                       categories=self.categories)
+
+    def analyze(self, source, filepath=None, context=None, definitions=None,
+                recorder=None):
+        tree = ast.parse(source, filepath)
+        warnings = (NullWarnings() if self.inference_only
+                    else warning.Warnings(filepath, *self.categories))
+        visitor = ModuleVisitor(filepath, context or builtin_context(), self,
+                                warnings, definitions=definitions,
+                                source=source, recorder=recorder)
+        visitor.visit(tree)
+        return visitor.report()
+
+
+def analyze(source, filepath=None, context=None, imported=None,
+            definitions=None, recorder=None, cancellation=None,
+            inference_only=False, categories=None):
+    """Raises cancellation.Cancelled if the cancellation token is set
+    before the analysis finishes. With inference_only, only the types are
+    inferred: checks that only produce warnings are skipped and the
+    returned warnings are empty. categories is (enabled, disabled) as in
+    Session."""
+    session = Session(imported, cancellation, inference_only, categories)
+    return session.analyze(source, filepath, context, definitions, recorder)
+
+
+class FileAnalysis(object):
+    """The result of analyzing one file with analyze_many. error holds the
+    exception if the file could not be read or analyzed."""
+    def __init__(self, filepath, scope=None, warnings=None, elapsed=0.0,
+                 error=None):
+        self.filepath = filepath
+        self.scope = scope
+        self.warnings = warnings
+        self.elapsed = elapsed
+        self.error = error
+
+
+def analyze_many(files, inference_only=False, categories=None):
+    """Analyzes each of files, given as filepaths or (filepath, source)
+    pairs, and yields a FileAnalysis as soon as each one finishes. The
+    builtin context, import resolutions and module summaries are shared, and
+    each analyzed file becomes the summary used by later files importing
+    it."""
+    import time
+    for item in files:
+        filepath, source = (item, None) if isinstance(item, basestring) \
+            else item
+        start = time.time()
+        try:
+            if source is None:
+                with open(filepath) as source_file:
+                    source = source_file.read()
+            absolute_path = os.path.abspath(filepath)
+            scope, warnings, _ = analyze(source, filepath,
+                                         imported=[absolute_path],
+                                         inference_only=inference_only,
+                                         categories=categories)
+        except Exception as error:  # pylint: disable=broad-except
+            yield FileAnalysis(filepath, elapsed=time.time() - start,
+                               error=error)
+            continue
+        register_summary(filepath, source, scope)
+        yield FileAnalysis(filepath, scope, warnings, time.time() - start)
+
+
+def analysis(source, filepath=None, context=None, show_types=False,
+             definitions=None):
+    scope, warnings, _ = analyze(source, filepath, context,
+                                 definitions=definitions)
     warning_output = str(warnings)
     if show_types: 
         scope_output = str(scope)
@@ -201,11 +636,93 @@ def analysis(source, filepath=None, context=None, show_types=False):
         return warning_output
 
 
+def split_categories(values):
+    return [category.strip() for value in values
+            for category in value.split(',') if category.strip()]
+
+
 def main():
+    global MAX_MEMORY           # pylint: disable=global-statement
     parser = optparse.OptionParser()
     parser.add_option('-t', '--types', dest='show_types', default=False,
                       help='Show types of symbols defined in top scope')
+    parser.add_option('-w', '--watch', dest='watch', action='store_true',
+                      default=False, help='Analyze every module under the '
+                      'given directory and re-analyze modules as they change')
+    parser.add_option('--interval', dest='interval', type='float',
+                      default=0.1, help='Polling interval for --watch')
+    parser.add_option('--build-stubs', dest='build_stubs',
+                      action='store_true', default=False,
+                      help='Prebuild the standard library stub summaries')
+    parser.add_option('--index', dest='index', default=None, metavar='DB',
+                      help='Write definitions, uses and types of every module '
+                      'under the given directory to a SQLite database')
+    parser.add_option('--changed-since', dest='changed_since', default=None,
+                      metavar='REVISION', help='Only check the modules under '
+                      'the given directory that differ from a git revision')
+    parser.add_option('--sample-literals', dest='sample_literals',
+                      type='int', default=None, metavar='N',
+                      help='Infer the element types of literals with more '
+                      'than N elements from a sample of N elements')
+    parser.add_option('--max-static-elements', dest='max_static_elements',
+                      type='int', default=evaluate.STATIC_VALUE_LIMIT,
+                      metavar='N', help='Do not track the values of literals '
+                      'with more than N elements (default %default)')
+    parser.add_option('--max-memory', dest='max_memory', type='int',
+                      default=None, metavar='MB', help='Move the least '
+                      'recently used module summaries to the on-disk cache '
+                      'when the process uses more than MB megabytes')
+    parser.add_option('--disable', dest='disable', action='append',
+                      default=[], metavar='CATEGORIES',
+                      help='Skip the checks of these comma separated warning '
+                      'categories, e.g. reassignment,type-change')
+    parser.add_option('--enable', dest='enable', action='append',
+                      default=None, metavar='CATEGORIES',
+                      help='Only run the checks of these comma separated '
+                      'warning categories')
     options, args = parser.parse_args()
+    if options.sample_literals is not None and options.sample_literals < 1:
+        parser.error('--sample-literals must be at least 1')
+    if options.enable is not None:
+        warning.ENABLED_CATEGORIES = frozenset(
+            split_categories(options.enable))
+    warning.DISABLED_CATEGORIES = frozenset(split_categories(options.disable))
+    expr.LITERAL_SAMPLE_SIZE = options.sample_literals
+    evaluate.STATIC_VALUE_LIMIT = options.max_static_elements
+    if options.max_memory is not None:
+        MAX_MEMORY = options.max_memory << 20
+    if options.build_stubs:
+        names = build_stub_summaries()
+        sys.stdout.write('built {0} stub summaries into {1}\n'.format(
+            len(names), STUB_SUMMARIES_PATH))
+        return
+    if options.index:
+        from index import index_project
+        analyzed, total = index_project(args[0] if args else '.',
+                                        options.index)
+        sys.stderr.write('indexed {0} of {1} module(s)\n'.format(
+            analyzed, total))
+        return
+    if options.changed_since:
+        import time
+        from changed import check_changed
+        start = time.time()
+        try:
+            changed, results = check_changed(args[0] if args else '.',
+                                             options.changed_since)
+        except RuntimeError as error:
+            sys.stderr.write(str(error) + '\n')
+            sys.exit(2)
+        for _, warnings in results:
+            sys.stdout.write(warnings)
+        sys.stderr.write('-- checked {0} changed module(s) in {1:.0f} '
+                         'ms\n'.format(len(changed),
+                                       (time.time() - start) * 1000))
+        return
+    if options.watch:
+        from watch import watch
+        watch(args[0] if args else '.', options.interval)
+        return
     if len(args) == 0:
         filepath = ''
         source = sys.stdin.read()
@@ -0,0 +1,109 @@
+"""
+Simulates clients typing quickly into the web editor: every client posts a
+longer prefix of a source file every interval without waiting for earlier
+responses, like the editor does. Prints the server's session metrics, which
+show that superseded analyses are cancelled and the wait queue stays bounded
+by the number of clients.
+
+    python server.py &
+    python load_test.py --clients 8 --interval 0.05
+"""
+import sys
+import json
+import time
+import uuid
+import optparse
+import threading
+try:
+    from urllib2 import urlopen, HTTPError
+    from urllib import urlencode
+except ImportError:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+    from urllib.parse import urlencode
+
+
+SOURCE = ''.join('def f{0}(a, b):\n    return a * {0} + b\n'
+                 'x{0} = f{0}(1, 2) + None\n'.format(i) for i in range(200))
+
+
+def post(url, session, source, results):
+    data = urlencode({'source': source, 'session': session}).encode('utf-8')
+    start = time.time()
+    try:
+        urlopen(url + '/process', data).read()
+        status = 200
+    except HTTPError as error:
+        status = error.code
+    results.append((status, time.time() - start))
+
+
+def client(url, steps, interval, results):
+    session = uuid.uuid4().hex
+    threads = []
+    for step in range(1, steps + 1):
+        source = SOURCE[:len(SOURCE) * step // steps]
+        # cut at a line boundary so that most prefixes parse
+        source = source[:source.rfind('\n') + 1]
+        thread = threading.Thread(target=post,
+                                  args=(url, session, source, results))
+        thread.start()
+        threads.append(thread)
+        time.sleep(interval)
+    for thread in threads:
+        thread.join()
+
+
+def sample_metrics(url, samples, stop):
+    while not stop.is_set():
+        metrics = json.loads(urlopen(url + '/metrics').read().decode('utf-8'))
+        samples.append(metrics['sessions'])
+        time.sleep(0.01)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--url', dest='url', default='http://localhost:4000')
+    parser.add_option('--clients', dest='clients', type='int', default=8)
+    parser.add_option('--steps', dest='steps', type='int', default=40,
+                      help='Submissions per client')
+    parser.add_option('--interval', dest='interval', type='float',
+                      default=0.05, help='Seconds between keystrokes')
+    options, _ = parser.parse_args()
+
+    results = []
+    samples = []
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_metrics,
+                               args=(options.url, samples, stop))
+    sampler.start()
+    start = time.time()
+    clients = [threading.Thread(target=client,
+                                args=(options.url, options.steps,
+                                      options.interval, results))
+               for _ in range(options.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.time() - start
+    stop.set()
+    sampler.join()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    report = {
+        'clients': options.clients,
+        'requests': len(results),
+        'elapsed': elapsed,
+        'statuses': statuses,
+        'max_waiting': max([x['waiting'] for x in samples] or [0]),
+        'max_running': max([x['running'] for x in samples] or [0]),
+        'sessions': samples[-1] if samples else None,
+    }
+    sys.stdout.write(json.dumps(report, indent=2, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Least-recently-used cache of formatted analysis results. Entries evicted
+from memory are optionally spilled to a directory and promoted back on the
+next hit. Hit counts and the analysis time that hits saved are kept for the
+metrics endpoint.
+"""
+import os
+import json
+import threading
+from hashlib import sha256
+from collections import OrderedDict
+
+
+def result_key(version, source):
+    return sha256(version.encode('utf-8') + b'~' +
+                  source.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, size=256, spill_dir=None):
+        self._size = size
+        self._spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.analysis_time = 0.0
+        self.saved_time = 0.0
+        if spill_dir is not None and not os.path.isdir(spill_dir):
+            os.makedirs(spill_dir)
+
+    def _spill_path(self, key):
+        return os.path.join(self._spill_dir, key + '.json')
+
+    def _spill(self, key, entry):
+        temp_path = '{0}.{1}.tmp'.format(self._spill_path(key), os.getpid())
+        with open(temp_path, 'w') as spill_file:
+            json.dump({'body': entry[0], 'elapsed': entry[1]}, spill_file)
+        os.rename(temp_path, self._spill_path(key))
+
+    def _unspill(self, key):
+        if self._spill_dir is None:
+            return None
+        try:
+            with open(self._spill_path(key)) as spill_file:
+                data = json.load(spill_file)
+        except (IOError, OSError, ValueError):
+            return None
+        return data['body'], data['elapsed']
+
+    def get(self, key):
+        """Returns the cached body for key or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = self._unspill(key)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self.disk_hits += 1
+            self._entries[key] = entry     # most recently used goes last
+            self._evict()
+            self.hits += 1
+            self.saved_time += entry[1]
+            return entry[0]
+
+    def put(self, key, body, elapsed):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (body, elapsed)
+            self.analysis_time += elapsed
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self._size:
+            key, entry = self._entries.popitem(last=False)
+            if self._spill_dir is not None:
+                self._spill(key, entry)
+
+    def record_not_modified(self, key):
+        # the client already has the result, so nothing is looked up, but
+        # the saved time is known if the result is still in memory
+        with self._lock:
+            self.not_modified += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.saved_time += entry[1]
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size': self._size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+                'analysis_time': self.analysis_time,
+                'saved_time': self.saved_time,
+            }
@@ -1,15 +1,36 @@
 import os
-from flask import Flask, request, render_template
+import re
+import time
+import uuid
+from flask import Flask, request, render_template, make_response, jsonify
 from subprocess import Popen, PIPE
+from result_cache import ResultCache, result_key
+from sessions import Sessions, Superseded
 
 app = Flask(__name__)
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+MAIN_PATH = os.path.join(os.path.dirname(SCRIPT_DIR), 'main.py')
+SESSION_COOKIE = 'pystarch_session'
 
 
-def analyze(source):
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    main_path = os.path.join(os.path.dirname(script_dir), 'main.py')
-    process = Popen(['python2', main_path],
+def tool_version():
+    with open(MAIN_PATH) as main_file:
+        match = re.search(r"^__version__ = '([^']+)'", main_file.read(),
+                          re.MULTILINE)
+    return match.group(1) if match else 'unknown'
+
+
+VERSION = tool_version()
+cache = ResultCache(int(os.environ.get('PYSTARCH_CACHE_SIZE', 256)),
+                    os.environ.get('PYSTARCH_CACHE_DIR'))
+sessions = Sessions(int(os.environ.get('PYSTARCH_WORKERS', 4)))
+
+
+def analyze(source, on_start=None):
+    process = Popen(['python2', MAIN_PATH],
                     stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    if on_start is not None:
+        on_start(process)
     stdout, stderr = process.communicate(source)
     return (stdout, True) if process.returncode == 0 else (stderr, False)
 
@@ -31,11 +52,55 @@ def format_output(output):
         return result
 
 
+def analyze_latest(session, source):
+    """Returns (output, success), or None if a newer request of the same
+    session superseded this one."""
+    generation = sessions.submit(session)
+    on_start = lambda process: sessions.started(session, generation, process)
+    try:
+        with sessions.worker(session, generation):
+            output, success = analyze(source, on_start)
+            if not sessions.is_current(session, generation):
+                return None     # killed, or finished after being superseded
+            return output, success
+    except Superseded:
+        return None
+
+
 @app.route('/process', methods=['POST'])
 def html():
     source = request.form.get('source')
-    output, success = analyze(source)
-    return format_output(output) if success else (output, 400)
+    session = (request.form.get('session') or
+               request.cookies.get(SESSION_COOKIE) or uuid.uuid4().hex)
+    etag = result_key(VERSION, source)
+    if request.if_none_match.contains(etag):
+        sessions.cancel(session)
+        cache.record_not_modified(etag)
+        response = make_response('', 304)
+    else:
+        body = cache.get(etag)
+        if body is not None:
+            sessions.cancel(session)
+        else:
+            start = time.time()
+            result = analyze_latest(session, source)
+            if result is None:
+                return 'Superseded by a newer request', 409
+            output, success = result
+            if not success:
+                return output, 400
+            body = format_output(output)
+            cache.put(etag, body, time.time() - start)
+        response = make_response(body)
+    response.set_etag(etag)
+    if request.cookies.get(SESSION_COOKIE) != session:
+        response.set_cookie(SESSION_COOKIE, session)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    return jsonify(cache=cache.metrics(), sessions=sessions.metrics())
 
 
 @app.route('/')
@@ -0,0 +1,113 @@
+"""
+Tracks the analysis requests of each client session. A new submission
+supersedes every earlier one from the same session: a running analysis
+process is killed and requests still waiting for a worker give up as soon
+as they are woken, so each session holds at most one worker and has at most
+one live request in the wait queue.
+"""
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+class Superseded(Exception):
+    pass
+
+
+class Sessions(object):
+    def __init__(self, workers):
+        self._workers = workers
+        self._condition = threading.Condition()
+        self._generations = itertools.count(1)
+        self._latest = {}       # session -> latest generation
+        self._processes = {}    # session -> (generation, running process)
+        self._running = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.cancelled = 0
+        self.completed = 0
+
+    def submit(self, session):
+        """Returns the generation of a new request and cancels the older
+        requests of the session."""
+        with self._condition:
+            self._cancel(session)
+            generation = next(self._generations)
+            self._latest[session] = generation
+            return generation
+
+    def cancel(self, session):
+        """Cancels the requests of the session, for example because a newer
+        request was answered from the cache."""
+        with self._condition:
+            self._cancel(session)
+
+    def _cancel(self, session):
+        self._latest.pop(session, None)
+        _, process = self._processes.pop(session, (None, None))
+        if process is not None:
+            self._kill(process)
+        self._condition.notify_all()
+
+    def is_current(self, session, generation):
+        with self._condition:
+            return self._latest.get(session) == generation
+
+    @contextmanager
+    def worker(self, session, generation):
+        """Waits for a free worker; raises Superseded if a newer request of
+        the same session arrives first."""
+        with self._condition:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                while (self._latest.get(session) == generation
+                       and self._running >= self._workers):
+                    self._condition.wait()
+            finally:
+                self.waiting -= 1
+            if self._latest.get(session) != generation:
+                self.cancelled += 1
+                raise Superseded()
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                if self._processes.get(session, (None,))[0] == generation:
+                    del self._processes[session]
+                if self._latest.get(session) == generation:
+                    del self._latest[session]
+                    self.completed += 1
+                else:
+                    self.cancelled += 1
+                self._condition.notify_all()
+
+    def started(self, session, generation, process):
+        """Registers the process running a request so that a newer request
+        can kill it."""
+        with self._condition:
+            if self._latest.get(session) != generation:
+                self._kill(process)
+            else:
+                self._processes[session] = (generation, process)
+
+    @staticmethod
+    def _kill(process):
+        try:
+            process.kill()
+        except OSError:
+            pass    # already exited
+
+    def metrics(self):
+        with self._condition:
+            return {
+                'workers': self._workers,
+                'running': self._running,
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting,
+                'sessions': len(self._latest),
+                'cancelled': self.cancelled,
+                'completed': self.completed,
+            }
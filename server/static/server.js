@@ -1,22 +1,33 @@
-
 var DIRTY = false;
-var WAITING = false;
+var SEQUENCE = 0;
+// one session per page load, so each open page supersedes only its own
+// requests and has its own analysis worker
+var SESSION = newSessionId();
+
+function newSessionId() {
+    var id = '';
+    for(var i = 0; i < 4; i++)
+        id += Math.floor(Math.random() * 0x100000000).toString(16);
+    return id;
+}
 
+// the server cancels a running analysis when the same session submits again,
+// so the latest source is posted right away and stale responses are ignored
 function update() {
-    DIRTY = false; 
-    WAITING = true;
+    DIRTY = false;
+    var sequence = ++SEQUENCE;
     var code = $('#input').val();
-    $.post('/process', {source: code}).done(function(response) {
-        $('#output').val(response);
-        WAITING = false;
-    }).fail(function() {
-        $('#output').val('Syntax error in source code');
-        WAITING = false;
+    $.post('/process', {source: code, session: SESSION}).done(function(response) {
+        if(sequence === SEQUENCE)
+            $('#output').val(response);
+    }).fail(function(xhr) {
+        if(sequence === SEQUENCE && xhr.status !== 409)
+            $('#output').val('Syntax error in source code');
     });
 }
 
 function onInterval() {
-    if(DIRTY && !WAITING)
+    if(DIRTY)
         update();
 }
 
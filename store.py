@@ -0,0 +1,272 @@
+"""
+Single-file store for the module summary cache. Blobs are appended to one
+data file and found through an open-addressing hash table in a memory-mapped
+index file, so a lookup is a few memory reads instead of a stat and an open
+per entry. Writers hold an exclusive lock, readers a shared one, and blobs
+are returned as buffers into the mapping without being copied.
+"""
+import os
+import mmap
+import fcntl
+import struct
+from thread import allocate_lock, get_ident
+from hashlib import sha256
+
+
+MAGIC = 'PSTRIDX1'
+# magic, capacity, used slots, dead bytes in the data file, replaced flag
+HEADER = struct.Struct('<8sQQQQ')
+REPLACED_OFFSET = HEADER.size - 8
+# key digest, offset and length of the blob in the data file
+SLOT = struct.Struct('<32sQI')
+LOCATION = struct.Struct('<QI')
+EMPTY_KEY = '\0' * 32
+DELETED = 0xffffffff
+INITIAL_CAPACITY = 1024
+MAX_LOAD = 0.5
+COMPACT_MIN_BYTES = 1 << 20
+
+
+def key_digest(key):
+    return sha256(key).digest()
+
+
+def build_index(entries, capacity, dead=0):
+    """Returns the contents of an index file holding entries, a list of
+    (digest, offset, length) tuples, for a data file with dead bytes that
+    no entry points to."""
+    while len(entries) > capacity * MAX_LOAD:
+        capacity *= 2
+    index = bytearray(HEADER.size + capacity * SLOT.size)
+    HEADER.pack_into(index, 0, MAGIC, capacity, len(entries), dead, 0)
+    for digest, offset, length in entries:
+        slot = struct.unpack_from('<Q', digest)[0] % capacity
+        while True:
+            position = HEADER.size + slot * SLOT.size
+            if index[position:position + 32] == EMPTY_KEY:
+                SLOT.pack_into(index, position, digest, offset, length)
+                break
+            slot = (slot + 1) % capacity
+    return index
+
+
+def replace_file(path, contents):
+    temp_path = '{0}.{1}.{2}.tmp'.format(path, os.getpid(), get_ident())
+    with open(temp_path, 'wb') as temp_file:
+        temp_file.write(contents)
+    os.rename(temp_path, path)
+
+
+class SummaryStore(object):
+    def __init__(self, directory):
+        self.directory = directory
+        self._index_path = os.path.join(directory, 'summaries.index')
+        self._data_path = os.path.join(directory, 'summaries.data')
+        self._lock_path = os.path.join(directory, 'summaries.lock')
+        self._pid = None
+        self._thread_lock = allocate_lock()
+        self._lock_file = None
+        self._index = None
+        self._capacity = None
+        self._data_file = None
+        self._data_map = None
+
+    def _acquire(self, operation):
+        # flock locks belong to the open file, which threads share, so they
+        # take turns on the thread lock first
+        self._thread_lock.acquire()
+        try:
+            # a forked child shares the open file with its parent, so every
+            # process opens the files itself
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._lock_file, operation)
+            if self._index[REPLACED_OFFSET] != '\0':
+                self._open_files()  # replaced by a rebuild in another process
+        except:
+            self._thread_lock.release()
+            raise
+
+    def _release(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def _open(self):
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                if not os.path.isdir(self.directory):
+                    raise
+        self._pid = os.getpid()
+        self._lock_file = open(self._lock_path, 'a')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(self._data_path):
+                open(self._data_path, 'ab').close()
+            if not os.path.exists(self._index_path):
+                replace_file(self._index_path,
+                             build_index([], INITIAL_CAPACITY))
+            self._open_files()
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _open_files(self):
+        # buffers returned earlier keep the old mappings alive, so they are
+        # dropped rather than closed
+        with open(self._index_path, 'r+b') as index_file:
+            self._index = mmap.mmap(index_file.fileno(), 0)
+        magic, self._capacity = HEADER.unpack_from(self._index, 0)[:2]
+        if magic != MAGIC:
+            raise RuntimeError('Corrupt summary index: ' + self._index_path)
+        if self._data_file is not None:
+            self._data_file.close()
+        self._data_file = open(self._data_path, 'a+b')
+        self._data_map = None
+
+    def _header(self):
+        return HEADER.unpack_from(self._index, 0)
+
+    def _set_counts(self, used, dead):
+        _, capacity, _, _, replaced = self._header()
+        HEADER.pack_into(self._index, 0, MAGIC, capacity, used, dead,
+                         replaced)
+
+    def _probe(self, digest):
+        """Returns the position of the slot for digest and whether the slot
+        already holds it."""
+        capacity = self._capacity
+        slot = struct.unpack_from('<Q', digest)[0] % capacity
+        index = self._index
+        while True:
+            position = HEADER.size + slot * SLOT.size
+            key = index[position:position + 32]
+            if key == digest:
+                return position, True
+            elif key == EMPTY_KEY:
+                return position, False
+            slot = (slot + 1) % capacity
+
+    def _data_size(self):
+        return os.fstat(self._data_file.fileno()).st_size
+
+    def _data_buffer(self, offset, length):
+        if self._data_map is None or offset + length > len(self._data_map):
+            self._data_map = mmap.mmap(self._data_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+        return buffer(self._data_map, offset, length)
+
+    def _entries(self):
+        entries = []
+        for slot in range(self._capacity):
+            digest, offset, length = SLOT.unpack_from(
+                self._index, HEADER.size + slot * SLOT.size)
+            if digest != EMPTY_KEY and length != DELETED:
+                entries.append((digest, offset, length))
+        return entries
+
+    def _rebuild(self, capacity, compact):
+        entries = self._entries()
+        # growing the index keeps the data file and so its dead bytes
+        dead = 0 if compact else self._header()[3]
+        if compact:
+            compacted = []
+            temp_path = '{0}.{1}.tmp'.format(self._data_path, os.getpid())
+            with open(temp_path, 'wb') as data_file:
+                for digest, offset, length in sorted(entries,
+                                                     key=lambda x: x[1]):
+                    compacted.append((digest, data_file.tell(), length))
+                    data_file.write(self._data_buffer(offset, length))
+            os.rename(temp_path, self._data_path)
+            entries = compacted
+        replace_file(self._index_path, build_index(entries, capacity, dead))
+        # tell processes that still map the old index to reopen the files
+        self._index[REPLACED_OFFSET] = '\1'
+        self._open_files()
+
+    def _maybe_compact(self):
+        dead = self._header()[3]
+        if dead > COMPACT_MIN_BYTES and dead * 2 > self._data_size():
+            self._rebuild(INITIAL_CAPACITY, compact=True)
+
+    def get(self, key):
+        """Returns a read-only buffer with the blob stored for key, or None.
+        The buffer stays valid after later writes and compactions."""
+        digest = key_digest(key)
+        self._acquire(fcntl.LOCK_SH)
+        try:
+            position, found = self._probe(digest)
+            if not found:
+                return None
+            offset, length = LOCATION.unpack_from(self._index, position + 32)
+            if length == DELETED:
+                return None
+            return self._data_buffer(offset, length)
+        finally:
+            self._release()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def put(self, key, blob):
+        digest = key_digest(key)
+        self._acquire(fcntl.LOCK_EX)
+        try:
+            _, capacity, used, dead, _ = self._header()
+            if (used + 1) > capacity * MAX_LOAD:
+                self._rebuild(capacity * 2, compact=False)
+                _, capacity, used, dead, _ = self._header()
+            position, found = self._probe(digest)
+            if found:
+                _, length = LOCATION.unpack_from(self._index, position + 32)
+                if length != DELETED:
+                    dead += length
+            else:
+                used += 1
+            self._data_file.seek(0, os.SEEK_END)
+            offset = self._data_file.tell()
+            self._data_file.write(blob)
+            self._data_file.flush()
+            # the location is written before the key so that a slot never
+            # matches a key without pointing at its blob
+            LOCATION.pack_into(self._index, position + 32, offset, len(blob))
+            self._index[position:position + 32] = digest
+            self._set_counts(used, dead)
+            self._maybe_compact()
+        finally:
+            self._release()
+
+    def delete(self, key):
+        digest = key_digest(key)
+        self._acquire(fcntl.LOCK_EX)
+        try:
+            position, found = self._probe(digest)
+            if not found:
+                return False
+            offset, length = LOCATION.unpack_from(self._index, position + 32)
+            if length == DELETED:
+                return False
+            # the slot keeps its key so that probe sequences stay intact
+            LOCATION.pack_into(self._index, position + 32, offset, DELETED)
+            _, _, used, dead, _ = self._header()
+            self._set_counts(used, dead + length)
+            self._maybe_compact()
+            return True
+        finally:
+            self._release()
+
+    def compact(self):
+        """Rewrites the data file without deleted or overwritten blobs and
+        the index without tombstones."""
+        self._acquire(fcntl.LOCK_EX)
+        try:
+            self._rebuild(INITIAL_CAPACITY, compact=True)
+        finally:
+            self._release()
+
+    def __len__(self):
+        self._acquire(fcntl.LOCK_SH)
+        try:
+            return len(self._entries())
+        finally:
+            self._release()
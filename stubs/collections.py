@@ -0,0 +1,85 @@
+"""
+Stub for the collections module.
+"""
+
+boolean = True
+number = 0
+
+def namedtuple(typename, field_names, verbose=boolean, rename=boolean):
+    return unknown
+
+class OrderedDict(object):
+    def __init__(self, items=None):
+        pass
+
+    def keys(self):
+        return unknown
+
+    def values(self):
+        return unknown
+
+    def items(self):
+        return unknown
+
+    def get(self, key, default=None):
+        return unknown
+
+    def pop(self, key, default=None):
+        return unknown
+
+    def popitem(self, last=boolean):
+        return unknown
+
+    def clear(self):
+        return None
+
+class defaultdict(object):
+    def __init__(self, default_factory=None):
+        self.default_factory = default_factory
+
+    def keys(self):
+        return unknown
+
+    def values(self):
+        return unknown
+
+    def items(self):
+        return unknown
+
+    def get(self, key, default=None):
+        return unknown
+
+class Counter(object):
+    def __init__(self, iterable=None):
+        pass
+
+    def most_common(self, n=None):
+        return [(unknown, number)]
+
+    def elements(self):
+        return unknown
+
+    def update(self, iterable):
+        return None
+
+class deque(object):
+    def __init__(self, iterable=None, maxlen=None):
+        self.maxlen = maxlen
+
+    def append(self, x):
+        return None
+
+    def appendleft(self, x):
+        return None
+
+    def pop(self):
+        return unknown
+
+    def popleft(self):
+        return unknown
+
+    def extend(self, iterable):
+        return None
+
+    def clear(self):
+        return None
@@ -0,0 +1,9 @@
+"""
+Stub for the copy module.
+"""
+
+def copy(x):
+    return x
+
+def deepcopy(x, memo=None):
+    return x
@@ -0,0 +1,18 @@
+"""
+Stub for the functools module.
+"""
+
+def partial(func, *args, **keywords):
+    return unknown
+
+def reduce(func, iterable, initializer=ANY):
+    return func(iterable[0], iterable[0])
+
+def wraps(wrapped, assigned=unknown, updated=unknown):
+    return unknown
+
+def total_ordering(cls):
+    return cls
+
+def cmp_to_key(mycmp):
+    return unknown
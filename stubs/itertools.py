@@ -0,0 +1,48 @@
+"""
+Stub for the itertools module.
+"""
+
+number = 0
+
+def chain(*iterables):
+    return unknown
+
+@types(number, number)
+def count(start=number, step=number):
+    return [number]
+
+def cycle(iterable):
+    return iterable
+
+def repeat(obj, times=number):
+    return [obj]
+
+def izip(iterable1, iterable2):
+    return [(iterable1[0], iterable2[0])]
+
+def imap(func, iterable):
+    return [func(x) for x in iterable]
+
+def ifilter(func, iterable):
+    return iterable
+
+def islice(iterable, start, stop=None, step=number):
+    return iterable
+
+def takewhile(predicate, iterable):
+    return iterable
+
+def dropwhile(predicate, iterable):
+    return iterable
+
+def groupby(iterable, key=None):
+    return unknown
+
+def product(*iterables, **kwargs):
+    return unknown
+
+def permutations(iterable, r=None):
+    return unknown
+
+def combinations(iterable, r):
+    return unknown
@@ -0,0 +1,101 @@
+"""
+Stub for the math module.
+"""
+
+boolean = True
+number = 0
+
+pi = 3.141592653589793
+e = 2.718281828459045
+
+@types(number)
+def ceil(x):
+    return number
+
+@types(number)
+def floor(x):
+    return number
+
+@types(number)
+def trunc(x):
+    return number
+
+@types(number)
+def fabs(x):
+    return number
+
+@types(number)
+def sqrt(x):
+    return number
+
+@types(number)
+def exp(x):
+    return number
+
+@types(number, number)
+def log(x, base=number):
+    return number
+
+@types(number)
+def log10(x):
+    return number
+
+@types(number, number)
+def pow(x, y):
+    return number
+
+@types(number, number)
+def hypot(x, y):
+    return number
+
+@types(number)
+def sin(x):
+    return number
+
+@types(number)
+def cos(x):
+    return number
+
+@types(number)
+def tan(x):
+    return number
+
+@types(number)
+def asin(x):
+    return number
+
+@types(number)
+def acos(x):
+    return number
+
+@types(number)
+def atan(x):
+    return number
+
+@types(number, number)
+def atan2(y, x):
+    return number
+
+@types(number)
+def degrees(x):
+    return number
+
+@types(number)
+def radians(x):
+    return number
+
+@types(number)
+def factorial(x):
+    return number
+
+@types(number, number)
+def fmod(x, y):
+    return number
+
+@types(number)
+def isnan(x):
+    return boolean
+
+@types(number)
+def isinf(x):
+    return boolean
@@ -0,0 +1,102 @@
+"""
+Stub for the os module. Like builtins.py, the functions have the same type
+signatures as the real ones but stubbed implementations.
+"""
+import posixpath as path
+
+boolean = True
+number = 0
+string = ''
+
+name = 'posix'
+sep = '/'
+altsep = None
+extsep = '.'
+pathsep = ':'
+linesep = '\n'
+curdir = '.'
+pardir = '..'
+devnull = '/dev/null'
+environ = {string: string}
+
+class stat_result(object):
+    def __init__(self):
+        self.st_mode = number
+        self.st_ino = number
+        self.st_dev = number
+        self.st_nlink = number
+        self.st_uid = number
+        self.st_gid = number
+        self.st_size = number
+        self.st_atime = number
+        self.st_mtime = number
+        self.st_ctime = number
+
+@types(string, string)
+def getenv(varname, value=None):
+    return string if boolean else value
+
+def getcwd():
+    return string
+
+def getpid():
+    return number
+
+@types(string)
+def chdir(path):
+    return None
+
+@types(string)
+def listdir(path):
+    return [string]
+
+@types(string, number)
+def mkdir(path, mode=number):
+    return None
+
+@types(string, number)
+def makedirs(path, mode=number):
+    return None
+
+@types(string)
+def remove(path):
+    return None
+
+@types(string)
+def unlink(path):
+    return None
+
+@types(string)
+def rmdir(path):
+    return None
+
+@types(string)
+def removedirs(path):
+    return None
+
+@types(string, string)
+def rename(src, dst):
+    return None
+
+@types(string)
+def stat(path):
+    return stat_result()
+
+@types(string, number)
+def access(path, mode):
+    return boolean
+
+@types(string, boolean, unknown, boolean)
+def walk(top, topdown=boolean, onerror=None, followlinks=boolean):
+    return [(string, [string], [string])]
+
+@types(string)
+def system(command):
+    return number
+
+@types(number)
+def urandom(n):
+    return string
+
+def cpu_count():
+    return number
@@ -0,0 +1,90 @@
+"""
+Stub for posixpath, which is also what os.path refers to.
+"""
+
+boolean = True
+number = 0
+string = ''
+
+sep = '/'
+curdir = '.'
+pardir = '..'
+
+def join(a, *p):
+    return string
+
+@types(string)
+def exists(path):
+    return boolean
+
+@types(string)
+def isfile(path):
+    return boolean
+
+@types(string)
+def isdir(path):
+    return boolean
+
+@types(string)
+def islink(path):
+    return boolean
+
+@types(string)
+def isabs(path):
+    return boolean
+
+@types(string)
+def abspath(path):
+    return string
+
+@types(string)
+def realpath(path):
+    return string
+
+@types(string)
+def normpath(path):
+    return string
+
+@types(string, string)
+def relpath(path, start=string):
+    return string
+
+@types(string)
+def dirname(path):
+    return string
+
+@types(string)
+def basename(path):
+    return string
+
+@types(string)
+def split(path):
+    return (string, string)
+
+@types(string)
+def splitext(path):
+    return (string, string)
+
+@types(string)
+def expanduser(path):
+    return string
+
+@types(string)
+def expandvars(path):
+    return string
+
+@types(string)
+def getsize(path):
+    return number
+
+@types(string)
+def getmtime(path):
+    return number
+
+@types(string)
+def getatime(path):
+    return number
+
+@types(string)
+def getctime(path):
+    return number
@@ -0,0 +1,37 @@
+"""
+Stub for the random module.
+"""
+
+number = 0
+
+def seed(a=None):
+    return None
+
+def random():
+    return number
+
+@types(number, number)
+def uniform(a, b):
+    return number
+
+@types(number, number)
+def randint(a, b):
+    return number
+
+@types(number, number, number)
+def randrange(start, stop=number, step=number):
+    return number
+
+def choice(seq):
+    return seq[0]
+
+def shuffle(x):
+    return None
+
+@types(unknown, number)
+def sample(population, k):
+    return population
+
+@types(number, number)
+def gauss(mu, sigma):
+    return number
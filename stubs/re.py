@@ -0,0 +1,91 @@
+"""
+Stub for the re module.
+"""
+
+boolean = True
+number = 0
+string = ''
+
+I = IGNORECASE = number
+L = LOCALE = number
+M = MULTILINE = number
+S = DOTALL = number
+U = UNICODE = number
+X = VERBOSE = number
+
+class error(object):
+    def __init__(self, msg):
+        self.msg = msg
+
+class MatchObject(object):
+    def __init__(self):
+        self.pos = number
+        self.endpos = number
+        self.string = string
+
+    def group(self, group=number):
+        return string
+
+    def groups(self, default=None):
+        return unknown
+
+    def groupdict(self, default=None):
+        return {string: string}
+
+    def start(self, group=number):
+        return number
+
+    def end(self, group=number):
+        return number
+
+    def span(self, group=number):
+        return (number, number)
+
+class RegexObject(object):
+    def __init__(self):
+        self.flags = number
+        self.groups = number
+        self.pattern = string
+
+    def match(self, string, pos=number, endpos=number):
+        return MatchObject() if boolean else None
+
+    def search(self, string, pos=number, endpos=number):
+        return MatchObject() if boolean else None
+
+    def findall(self, string, pos=number, endpos=number):
+        return [string]
+
+    def split(self, string, maxsplit=number):
+        return [string]
+
+    def sub(self, repl, string, count=number):
+        return string
+
+@types(string, number)
+def compile(pattern, flags=number):
+    return RegexObject()
+
+@types(string, string, number)
+def match(pattern, string, flags=number):
+    return MatchObject() if boolean else None
+
+@types(string, string, number)
+def search(pattern, string, flags=number):
+    return MatchObject() if boolean else None
+
+@types(string, string, number)
+def findall(pattern, string, flags=number):
+    return [string]
+
+@types(string, string, number, number)
+def split(pattern, string, maxsplit=number, flags=number):
+    return [string]
+
+@types(string, unknown, string, number, number)
+def sub(pattern, repl, string, count=number, flags=number):
+    return string
+
+@types(string)
+def escape(string):
+    return string
@@ -0,0 +1,27 @@
+"""
+Stub for the shutil module.
+"""
+
+string = ''
+
+@types(string, string)
+def copy(src, dst):
+    return None
+
+@types(string, string)
+def copy2(src, dst):
+    return None
+
+@types(string, string)
+def copyfile(src, dst):
+    return None
+
+def copytree(src, dst, symlinks=False, ignore=None):
+    return None
+
+def rmtree(path, ignore_errors=False, onerror=None):
+    return None
+
+@types(string, string)
+def move(src, dst):
+    return None
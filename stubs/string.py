@@ -0,0 +1,47 @@
+"""
+Stub for the string module.
+"""
+
+number = 0
+string = ''
+
+ascii_letters = string
+ascii_lowercase = string
+ascii_uppercase = string
+letters = string
+lowercase = string
+uppercase = string
+digits = string
+hexdigits = string
+octdigits = string
+punctuation = string
+printable = string
+whitespace = string
+
+@types(string, string)
+def capwords(s, sep=None):
+    return string
+
+@types(string)
+def lower(s):
+    return string
+
+@types(string)
+def upper(s):
+    return string
+
+@types(string, string)
+def strip(s, chars=string):
+    return string
+
+@types(string, string, number)
+def split(s, sep=string, maxsplit=number):
+    return [string]
+
+@types([string], string)
+def join(words, sep=string):
+    return string
+
+@types(string, string, string, number)
+def replace(s, old, new, maxreplace=number):
+    return string
@@ -0,0 +1,50 @@
+"""
+Stub for the subprocess module.
+"""
+
+number = 0
+string = ''
+
+PIPE = -1
+STDOUT = -2
+
+class CalledProcessError(object):
+    def __init__(self, returncode, cmd, output=None):
+        self.returncode = returncode
+        self.cmd = cmd
+        self.output = output
+
+class Popen(object):
+    def __init__(self, args, bufsize=number, executable=None, stdin=None,
+                 stdout=None, stderr=None, preexec_fn=None, close_fds=False,
+                 shell=False, cwd=None, env=None):
+        self.args = args
+        self.pid = number
+        self.returncode = number
+        self.stdin = file(string)
+        self.stdout = file(string)
+        self.stderr = file(string)
+
+    def communicate(self, input=None):
+        return (string, string)
+
+    def poll(self):
+        return number
+
+    def wait(self):
+        return number
+
+    def kill(self):
+        return None
+
+    def terminate(self):
+        return None
+
+def call(args, **kwargs):
+    return number
+
+def check_call(args, **kwargs):
+    return number
+
+def check_output(args, **kwargs):
+    return string
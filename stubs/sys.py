@@ -0,0 +1,44 @@
+"""
+Stub for the sys module.
+"""
+
+boolean = True
+number = 0
+string = ''
+
+argv = [string]
+path = [string]
+modules = {string: unknown}
+platform = string
+version = string
+hexversion = number
+maxint = number
+maxsize = number
+byteorder = string
+executable = string
+prefix = string
+stdin = file(string)
+stdout = file(string)
+stderr = file(string)
+
+def exit(status=None):
+    return None
+
+def getrecursionlimit():
+    return number
+
+@types(number)
+def setrecursionlimit(limit):
+    return None
+
+def getsizeof(obj, default=number):
+    return number
+
+def getdefaultencoding():
+    return string
+
+def getfilesystemencoding():
+    return string
+
+def exc_info():
+    return (unknown, unknown, unknown)
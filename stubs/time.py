@@ -0,0 +1,35 @@
+"""
+Stub for the time module.
+"""
+
+number = 0
+string = ''
+
+timezone = number
+altzone = number
+daylight = number
+
+def time():
+    return number
+
+def clock():
+    return number
+
+@types(number)
+def sleep(secs):
+    return None
+
+def strftime(format, t=unknown):
+    return string
+
+def gmtime(secs=number):
+    return unknown
+
+def localtime(secs=number):
+    return unknown
+
+def mktime(t):
+    return number
+
+def ctime(secs=number):
+    return string
@@ -0,0 +1,96 @@
+"""
+Checks --changed-since on a throwaway git repository: a.py is imported by
+b.py, which is imported by c.py. After a.py and d.py are changed, only
+their warnings must be reported, c.py must be inferred again through b.py
+instead of reusing stale summaries, and d.py, which cannot be analyzed,
+must be reported as failed without stopping the check.
+
+    python test/changed_since.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
+import main as analyzer
+from changed import check_changed
+
+
+COMMITTED = {
+    'a.py': 'X = 1\n',
+    'b.py': 'from a import X\nY = X\nz = 1\nz = 2\n',
+    'c.py': 'from b import Y\nW = Y\n',
+    'd.py': 'class A(object):\n    pass\n',
+}
+
+CHANGED = {
+    'a.py': 'X = "s"\nv = 1\nv = 2\n',
+    # methods without arguments make the analysis fail
+    'd.py': 'class A(object):\n    def f():\n        pass\n',
+}
+
+
+def write_files(root, files):
+    for name, source in files.items():
+        with open(os.path.join(root, name), 'w') as source_file:
+            source_file.write(source)
+
+
+def git(root, *args):
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(('git', '-c', 'user.name=test',
+                               '-c', 'user.email=test@example.com') + args,
+                              cwd=root, stdout=devnull)
+
+
+def check(root):
+    """Returns a list of the failed checks."""
+    write_files(root, COMMITTED)
+    git(root, 'init', '-q')
+    git(root, 'add', '.')
+    git(root, 'commit', '-q', '-m', 'initial')
+    paths = dict((name, os.path.join(root, name)) for name in COMMITTED)
+    # summaries of the committed sources, which must not be reused
+    list(analyzer.analyze_many([paths[x] for x in sorted(COMMITTED)]))
+    write_files(root, CHANGED)
+
+    changed, results = check_changed(root, 'HEAD')
+    failures = []
+    if changed != [paths['a.py'], paths['d.py']]:
+        failures.append('changed modules: {0}'.format(changed))
+    output = dict(results)
+    if 'reassignment' not in output.get(paths['a.py'], ''):
+        failures.append('a.py warnings: {0!r}'.format(
+            output.get(paths['a.py'])))
+    if 'analysis failed' not in output.get(paths['d.py'], ''):
+        failures.append('d.py result: {0!r}'.format(
+            output.get(paths['d.py'])))
+    if any(paths['b.py'] in warnings for warnings in output.values()):
+        failures.append('warnings of the unchanged b.py were reported')
+    summary = analyzer._module_summaries.get(paths['c.py'])
+    inferred = None if summary is None else \
+        str(summary[1].attributes.get_type('W'))
+    if inferred != 'Str':
+        failures.append('c.py was not inferred again through b.py: '
+                        'W is {0}'.format(inferred))
+    return failures
+
+
+def main():
+    root = os.path.realpath(tempfile.mkdtemp(prefix='pystarch-changed-'))
+    analyzer.CACHE_DIR = tempfile.mkdtemp(prefix='pystarch-changed-cache-')
+    try:
+        failures = check(root)
+    finally:
+        shutil.rmtree(root)
+        shutil.rmtree(analyzer.CACHE_DIR)
+    for failure in failures:
+        sys.stdout.write('FAILED: {0}\n'.format(failure))
+    sys.stdout.write('{0} check(s) failed\n'.format(len(failures)))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Analyzes every module of a generated project with analyze_many under a
+memory cap and fails if the peak resident memory of the analyzing process
+exceeds the cap by more than the headroom, or if any module fails. With
+--compare, the project is analyzed again without a cap and the warnings must
+be the same.
+
+    python test/memory.py --modules 10000 --max-memory 150
+"""
+import os
+import sys
+import shutil
+import tempfile
+import optparse
+import multiprocessing
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
+sys.path.append(os.path.join(os.path.dirname(TEST_DIR), 'bench'))
+import main as analyzer
+from generate import generate_project
+
+
+def peak_memory():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) << 10
+    return None
+
+
+def analyze_project(paths, max_memory, queue):
+    analyzer.CACHE_DIR = tempfile.mkdtemp(prefix='pystarch-memory-cache-')
+    analyzer.MAX_MEMORY = max_memory
+    try:
+        output, failed = [], []
+        for result in analyzer.analyze_many(paths):
+            if result.error is not None:
+                failed.append('{0}: {1}'.format(result.filepath, result.error))
+            else:
+                output.append(str(result.warnings))
+        queue.put({'output': ''.join(output), 'failed': failed,
+                   'evicted': analyzer._module_summaries.evicted,
+                   'peak_memory': peak_memory()})
+    finally:
+        shutil.rmtree(analyzer.CACHE_DIR)
+
+
+def run(paths, max_memory):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=analyze_project,
+                                      args=(paths, max_memory, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--modules', dest='modules', type='int', default=10000)
+    parser.add_option('--group-size', dest='group_size', type='int',
+                      default=50, help='Modules only import from their own '
+                      'group of this many modules')
+    parser.add_option('--max-memory', dest='max_memory', type='int',
+                      default=150, metavar='MB')
+    parser.add_option('--headroom', dest='headroom', type='int', default=32,
+                      metavar='MB', help='How far the peak may exceed the '
+                      'cap, which is only checked between modules')
+    parser.add_option('--compare', dest='compare', action='store_true',
+                      default=False, help='Compare the warnings with an '
+                      'analysis without a cap')
+    options, _ = parser.parse_args()
+
+    project_dir = tempfile.mkdtemp(prefix='pystarch-memory-project-')
+    try:
+        paths = generate_project(project_dir, modules=options.modules,
+                                 functions=2, classes=1, nesting=1,
+                                 optionals=0, group_size=options.group_size)
+        capped = run(paths, options.max_memory << 20)
+        uncapped = run(paths, None) if options.compare else None
+    finally:
+        shutil.rmtree(project_dir)
+
+    errors = capped['failed'][:10]
+    limit = (options.max_memory + options.headroom) << 20
+    sys.stdout.write('{0} modules, {1} summaries evicted, peak {2} MB with a '
+                     '{3} MB cap\n'.format(len(paths), capped['evicted'],
+                                          capped['peak_memory'] >> 20,
+                                          options.max_memory))
+    if capped['peak_memory'] > limit:
+        errors.append('peak memory exceeds the cap by more than {0} MB'.format(
+            options.headroom))
+    if uncapped is not None:
+        sys.stdout.write('peak {0} MB without a cap\n'.format(
+            uncapped['peak_memory'] >> 20))
+        if uncapped['output'] != capped['output']:
+            errors.append('the warnings differ from the uncapped analysis')
+    for error in errors:
+        sys.stdout.write('FAILED: {0}\n'.format(error))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,129 @@
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+import time
+import optparse
+import traceback
+from multiprocessing import Pool, cpu_count
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
 from main import analysis
+from incremental import Definitions
 from difflib import unified_diff
 
 
-def main():
-    filenames = os.listdir('testcases')
-    python_filenames = [x for x in filenames if x.endswith('.py')]
-    for filename in python_filenames:
-        name, _ = os.path.splitext(filename)
-        filepath = os.path.join('testcases', filename)
-        golden_path = os.path.join('golden', name + '.out')
-        if not os.path.exists(golden_path):
-            print(name + ': MISSING GOLDEN FILE')
-            continue
-        with open(filepath) as source_file:
-            source = source_file.read()
+TESTCASES_DIR = os.path.join(TEST_DIR, 'testcases')
+GOLDEN_DIR = os.path.join(TEST_DIR, 'golden')
+BASELINE_PATH = os.path.join(TEST_DIR, 'timings.json')
+
+
+def run_case(name):
+    filepath = os.path.join('testcases', name + '.py')
+    golden_path = os.path.join(GOLDEN_DIR, name + '.out')
+    if not os.path.exists(golden_path):
+        return name, 'MISSING GOLDEN FILE', [], None
+    with open(os.path.join(TEST_DIR, filepath)) as source_file:
+        source = source_file.read()
+    # analyze relative to the test directory so that the filepaths in the
+    # output match the golden files no matter where the runner is started
+    os.chdir(TEST_DIR)
+    start = time.time()
+    try:
         output = analysis(source, filepath, show_types=True)
-        with open(golden_path) as golden_file:
-            golden_output = golden_file.read()
-        if output == golden_output:
-            print(name + ': PASSED')
+    except Exception:   # pylint: disable=broad-except
+        return name, 'ERROR', traceback.format_exc().splitlines(), None
+    elapsed = time.time() - start
+    with open(golden_path) as golden_file:
+        golden_output = golden_file.read()
+    if output == golden_output:
+        # analyzing again with every definition reused must not change
+        # anything, even when the line numbers have shifted
+        definitions = Definitions()
+        analysis(source, filepath, show_types=True, definitions=definitions)
+        shifted = analysis('\n' + source, filepath, show_types=True,
+                           definitions=definitions)
+        if shifted != analysis('\n' + source, filepath, show_types=True):
+            return name, 'FAILED (incremental)', [], elapsed
+        return name, 'PASSED', [], elapsed
+    diffs = unified_diff(golden_output.splitlines(), output.splitlines())
+    return name, 'FAILED', list(diffs), elapsed
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, timings):
+    with open(path, 'w') as baseline_file:
+        json.dump(timings, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def is_regression(elapsed, baseline, threshold, min_delta):
+    return (baseline is not None and elapsed is not None
+            and elapsed > baseline * threshold
+            and elapsed - baseline > min_delta)
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [testcase ...]')
+    parser.add_option('-j', '--jobs', dest='jobs', type='int',
+                      default=cpu_count(), help='Number of worker processes')
+    parser.add_option('--baseline', dest='baseline', default=BASELINE_PATH,
+                      help='Timing baseline file')
+    parser.add_option('--update-baseline', dest='update_baseline',
+                      action='store_true', default=False,
+                      help='Write the measured timings to the baseline file')
+    parser.add_option('--threshold', dest='threshold', type='float',
+                      default=1.5, help='Allowed slowdown ratio per case')
+    parser.add_option('--min-delta', dest='min_delta', type='float',
+                      default=0.05, help='Ignore slowdowns below this many '
+                      'seconds to avoid noise on tiny cases')
+    options, args = parser.parse_args()
+
+    names = args or sorted(os.path.splitext(x)[0]
+                           for x in os.listdir(TESTCASES_DIR)
+                           if x.endswith('.py'))
+    pool = Pool(max(1, options.jobs))
+    try:
+        results = pool.map(run_case, names)
+    finally:
+        pool.close()
+        pool.join()
+
+    baseline = load_baseline(options.baseline)
+    failures = 0
+    regressions = 0
+    timings = {}
+    for name, status, lines, elapsed in results:
+        if elapsed is not None:
+            timings[name] = elapsed
+            baseline_time = baseline.get(name)
+            if options.update_baseline:
+                timing = ' {0:.3f}s'.format(elapsed)
+            elif is_regression(elapsed, baseline_time, options.threshold,
+                               options.min_delta):
+                regressions += 1
+                timing = ' {0:.3f}s SLOWER (baseline {1:.3f}s)'.format(
+                    elapsed, baseline_time)
+            else:
+                timing = ' {0:.3f}s'.format(elapsed)
         else:
-            print(name + ': FAILED')
-            diffs = unified_diff(golden_output.splitlines(),
-                output.splitlines())
-            for diff in diffs:
-                print(diff)
+            timing = ''
+        print(name + ': ' + status + timing)
+        for line in lines:
+            print(line)
+        if status != 'PASSED':
+            failures += 1
+
+    if options.update_baseline:
+        save_baseline(options.baseline, timings)
+    print('{0} passed, {1} failed, {2} slower than baseline'.format(
+        len(results) - failures, failures, regressions))
+    sys.exit(1 if failures or regressions else 0)
 
 
 if __name__ == '__main__':
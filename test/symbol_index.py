@@ -0,0 +1,112 @@
+"""
+Indexes a small project and checks that the index has a use at each place
+a name or attribute is read, including statements that are not type
+checked, like print and assert, and the targets of augmented assignments.
+Then a module that is imported through another one changes, and the types
+recorded for the modules importing it must change too.
+
+    python test/symbol_index.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
+import main as analyzer
+from index import Index, index_project
+
+
+SOURCE = '''\
+import sys
+x = 1
+y = 2
+z = 3
+x += 1
+x = y
+print x
+print >>sys.stderr, y
+assert z, x
+raise ValueError(y)
+'''
+
+# (name, line) of the uses that must be in the index
+EXPECTED_USES = [
+    ('x', 5),   # x += 1
+    ('x', 7),   # print x
+    ('sys', 8),
+    ('stderr', 8),
+    ('y', 8),
+    ('z', 9),
+    ('x', 9),
+    ('y', 6),
+    ('y', 10),
+    ('ValueError', 10),
+]
+
+# c.py is imported by b.py, which is imported by a.py
+CHAIN = {'a.py': 'import b\nu = b.w\n', 'b.py': 'import c\nw = c.v\n',
+         'c.py': 'v = 1\n'}
+CHANGED_C = 'v = "x"\n'
+
+
+def write_files(directory, files):
+    for name, source in files.items():
+        with open(os.path.join(directory, name), 'w') as source_file:
+            source_file.write(source)
+
+
+def indexed_type(database, name):
+    index = Index(database)
+    try:
+        return [row[5] for row in index.definitions(name)]
+    finally:
+        index.close()
+
+
+def check_uses(directory):
+    write_files(directory, {'a.py': SOURCE})
+    database = os.path.join(directory, 'index.db')
+    index_project(directory, database)
+    index = Index(database)
+    try:
+        return [(name, line) for name, line in EXPECTED_USES
+                if line not in [row[1] for row in index.uses(name)]]
+    finally:
+        index.close()
+
+
+def check_reindex(directory):
+    """Returns the types of u before and after c.py changes."""
+    write_files(directory, CHAIN)
+    database = os.path.join(directory, 'index.db')
+    index_project(directory, database)
+    before = indexed_type(database, 'u')
+    write_files(directory, {'c.py': CHANGED_C})
+    index_project(directory, database)
+    return before, indexed_type(database, 'u')
+
+
+def main():
+    directories = [tempfile.mkdtemp(prefix='pystarch-index-')
+                   for _ in range(2)]
+    analyzer.CACHE_DIR = tempfile.mkdtemp(prefix='pystarch-index-cache-')
+    try:
+        missing = check_uses(directories[0])
+        types = check_reindex(directories[1])
+    finally:
+        for directory in directories + [analyzer.CACHE_DIR]:
+            shutil.rmtree(directory)
+    for name, line in missing:
+        sys.stdout.write('MISSING: use of {0} at a.py:{1}\n'.format(name, line))
+    sys.stdout.write('{0} of {1} uses found\n'.format(
+        len(EXPECTED_USES) - len(missing), len(EXPECTED_USES)))
+    stale = types != (['Num'], ['Str'])
+    if stale:
+        sys.stdout.write('FAILED: u is {0} before and {1} after c.py '
+                         'changes\n'.format(*types))
+    sys.exit(1 if missing or stale else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,3 +22,15 @@ def j(x):
 
 def k(a, b):
     return len(a * b)
+
+
+def m(x):
+    y = x
+    return y - 1
+
+
+def n(a, b):
+    c = a + b
+    d = c
+    e = d
+    return e - 1
@@ -0,0 +1,13 @@
+X = 1
+def f():
+    return X
+a = f()
+X = 's'
+b = f()
+
+def g():
+    return h()
+c = g()
+def h():
+    return 1
+d = g()
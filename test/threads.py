@@ -0,0 +1,111 @@
+"""
+Analyzes the golden testcases in many threads at once and compares every
+result with a sequential analysis. The first round starts with empty
+caches, so the threads race to analyze the builtins, stubs and imported
+modules, and the second round calls the shared summaries concurrently.
+
+    python test/threads.py --threads 16 --repeat 2
+"""
+import os
+import sys
+import shutil
+import tempfile
+import optparse
+import threading
+import traceback
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
+import main as analyzer
+
+
+TESTCASES_DIR = os.path.join(TEST_DIR, 'testcases')
+
+
+def load_cases():
+    cases = []
+    for filename in sorted(os.listdir(TESTCASES_DIR)):
+        if filename.endswith('.py'):
+            filepath = os.path.join('testcases', filename)
+            with open(os.path.join(TEST_DIR, filepath)) as source_file:
+                cases.append((filepath, source_file.read()))
+    return cases
+
+
+def analyze_case(filepath, source):
+    try:
+        return analyzer.analysis(source, filepath, show_types=True)
+    except Exception:   # pylint: disable=broad-except
+        # only the exception matters, tracebacks differ between threads
+        return 'ERROR ' + traceback.format_exc().splitlines()[-1]
+
+
+def reset_caches():
+    analyzer.CACHE_DIR = tempfile.mkdtemp(prefix='pystarch-threads-cache-')
+    analyzer._module_summaries.clear()
+    analyzer._stub_summaries = None
+    analyzer._builtin_context = None
+    analyzer.clear_resolved_modules()
+
+
+def run_threads(cases, count, repeat):
+    """Returns a list of (filepath, output) from count threads that each
+    analyze every case repeat times, in a different order per thread."""
+    results = []
+    start = threading.Event()
+
+    def work(index):
+        start.wait()
+        ordered = cases[index % len(cases):] + cases[:index % len(cases)]
+        for _ in range(repeat):
+            for filepath, source in ordered:
+                results.append((filepath, analyze_case(filepath, source)))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--threads', dest='threads', type='int', default=16)
+    parser.add_option('--repeat', dest='repeat', type='int', default=2)
+    parser.add_option('--check-interval', dest='check_interval', type='int',
+                      default=1, help='Bytecodes between thread switches, '
+                      'lower to switch threads more often')
+    options, _ = parser.parse_args()
+
+    # the filepaths in the testcases are relative to the test directory
+    os.chdir(TEST_DIR)
+    cases = load_cases()
+    cache_dirs = []
+    try:
+        reset_caches()
+        cache_dirs.append(analyzer.CACHE_DIR)
+        expected = dict((filepath, analyze_case(filepath, source))
+                        for filepath, source in cases)
+        reset_caches()
+        cache_dirs.append(analyzer.CACHE_DIR)
+        sys.setcheckinterval(options.check_interval)
+        cold = run_threads(cases, options.threads, 1)
+        warm = run_threads(cases, options.threads, options.repeat)
+    finally:
+        for cache_dir in cache_dirs:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    failures = sorted(set(filepath for filepath, output in cold + warm
+                          if output != expected[filepath]))
+    sys.stdout.write('{0} analyses in {1} threads, {2} testcase(s) '
+                     'differ from the sequential analysis\n'.format(
+                         len(cold) + len(warm), options.threads,
+                         len(failures)))
+    for filepath in failures:
+        sys.stdout.write('FAILED: {0}\n'.format(filepath))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
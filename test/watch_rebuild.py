@@ -0,0 +1,90 @@
+"""
+Edits a module under watch mode step by step and checks that after every
+rebuild the warnings and the summary are the same as those of a fresh
+analysis of the new source. Unchanged definitions are reused between
+rebuilds and their functions are compacted, so this catches results that
+a reused function remembered from an earlier version of the module.
+
+    python test/watch_rebuild.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(TEST_DIR))
+import main as analyzer
+from watch import Project
+
+
+# each case is the sources of m.py, one per rebuild
+CASES = {
+    'redefined-callee': [
+        'def f(a):\n    return g(a)\ndef g(a):\n    return a + 1\n'
+        'r = f(1)\n',
+        'def f(a):\n    return g(a)\ndef g(a):\n    return a + 1\n'
+        'r = f(1)\nz = 1\n',
+        'def f(a):\n    return g(a)\ndef g(a):\n    return "x"\n'
+        'r = f(1)\nz = 1\n',
+    ],
+    'rebound-global': [
+        'X = 1\ndef f():\n    return X\na = f()\n',
+        'X = 1\ndef f():\n    return X\na = f()\nX = "s"\nb = f()\n',
+    ],
+    'later-definition': [
+        'def f():\n    return g()\ndef g():\n    return 1\nc = f()\n',
+        'def f():\n    return g()\nc = f()\ndef g():\n    return 1\n'
+        'd = f()\n',
+    ],
+    'method': [
+        'def g():\n    return 1\nclass A(object):\n'
+        '    def m(self):\n        return g()\nr = A().m()\n',
+        'def g():\n    return "x"\nclass A(object):\n'
+        '    def m(self):\n        return g()\nr = A().m()\n',
+    ],
+}
+
+
+def run_case(root, sources):
+    """Returns the first step whose rebuild differs from a fresh analysis,
+    as (step, rebuilt, fresh), or None."""
+    filepath = os.path.join(root, 'm.py')
+    project = Project(root)
+    for step, source in enumerate(sources):
+        with open(filepath, 'w') as source_file:
+            source_file.write(source)
+        if step == 0:
+            warnings = dict(project.analyze_all())[filepath]
+        else:
+            warnings = dict(project.update([filepath]))[filepath]
+        summary = analyzer._module_summaries.get(filepath)[1]
+        rebuilt = str(summary.attributes) + warnings
+        scope, fresh_warnings, _ = analyzer.analyze(source, filepath,
+                                                    imported=[])
+        fresh = str(scope) + str(fresh_warnings)
+        if rebuilt != fresh:
+            return step, rebuilt, fresh
+    return None
+
+
+def main():
+    failures = 0
+    for name, sources in sorted(CASES.items()):
+        root = tempfile.mkdtemp(prefix='pystarch-watch-')
+        try:
+            result = run_case(root, sources)
+        finally:
+            shutil.rmtree(root)
+        if result is None:
+            sys.stdout.write('{0}: PASSED\n'.format(name))
+            continue
+        failures += 1
+        step, rebuilt, fresh = result
+        sys.stdout.write('{0}: FAILED at step {1}\n-- rebuilt\n{2}\n'
+                         '-- fresh\n{3}\n'.format(name, step, rebuilt, fresh))
+    sys.stdout.write('{0} of {1} cases failed\n'.format(failures, len(CASES)))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,21 +5,80 @@ from backend import visit_expression, assign, unify_types, ExtendedContext, \
     Scope, static_evaluate, UnknownValue, NoneType, Bool, List, Instance, \
     Class, Unknown, maybe_inferences, Symbol, type_subset, Context, \
     construct_function_type, FunctionSignature, ClassEvaluator, Union, Set, \
-    Dict, Str
+    Dict, Str, NullWarnings, Details
+
+
+# nodes that cannot contain a node with a handler, like the elements of
+# large literals
+LEAF_NODES = (ast.Num, ast.Str, ast.Name)
+
+
+def handled_descendants(node, handled):
+    for _, value in ast.iter_fields(node):
+        children = value if isinstance(value, list) else [value]
+        for child in children:
+            if not isinstance(child, ast.AST):
+                continue
+            if child.__class__.__name__ in handled:
+                yield child
+            elif not isinstance(child, LEAF_NODES):
+                for descendant in handled_descendants(child, handled):
+                    yield descendant
 
 
 class ScopeVisitor(ast.NodeVisitor):
-    def __init__(self, filepath='', context=None, imported=[], warnings=None):
+    def __init__(self, filepath='', context=None, warnings=None,
+                 recorder=None):
         ast.NodeVisitor.__init__(self)
         self._filepath = filepath
         self._warnings = Warnings(filepath) if warnings is None else warnings
+        # like warnings, definitions and uses are only recorded on the first
+        # pass, so clones used to evaluate calls don't get the recorder
+        self._recorder = recorder
         self._context = context if context is not None else Context()
-        self._imported = imported
         self._annotations = []
         self._class_instance = None
 
-    def clone(self):
-        return ScopeVisitor(self._filepath, self.context(), self._imported)
+    def handled(self):
+        """Names of the node classes this visitor has a handler for."""
+        cls = self.__class__
+        if '_handled_classes' not in cls.__dict__:
+            cls._handled_classes = frozenset(
+                name[len('visit_'):] for name in dir(cls)
+                if name.startswith('visit_'))
+        return cls._handled_classes
+
+    def generic_visit(self, node):
+        # same as ast.NodeVisitor.generic_visit, but the descendants that
+        # have a handler (not looking inside them) are found once per node,
+        # because function bodies are visited again for every call
+        handled = self.handled()
+        lowered = getattr(node, '_lowered', None)
+        if lowered is None or lowered[0] is not handled:
+            lowered = (handled, tuple(handled_descendants(node, handled)))
+            node._lowered = lowered
+        for child in lowered[1]:
+            self.visit(child)
+
+    def lower(self, body):
+        """Resolves the handler of each statement of a function body once
+        and leaves out statements that cannot change the result, like
+        docstrings and pass. The handlers are unbound, so that the steps can
+        be run with any visitor of this class."""
+        cls = self.__class__
+        steps = []
+        for stmt in body:
+            if isinstance(stmt, ast.Pass) or (isinstance(stmt, ast.Expr)
+                    and isinstance(stmt.value, (ast.Str, ast.Num))):
+                continue
+            name = 'visit_' + stmt.__class__.__name__
+            steps.append((getattr(cls, name, cls.generic_visit), stmt))
+        return tuple(steps)
+
+    def clone(self, constraints=True):
+        # clones evaluate calls, their warnings are never shown
+        context = ExtendedContext(self._context, constraints)
+        return ScopeVisitor(self._filepath, context, NullWarnings())
 
     def scope(self):
         return self._context.get_top_scope()
@@ -51,30 +110,56 @@ class ScopeVisitor(ast.NodeVisitor):
     def evaluate(self, node):
         return static_evaluate(node, self.context())
 
+    def record_uses(self, node):
+        if self._recorder is not None and node is not None:
+            self._recorder.use_names(node, self._context)
+
     def check_type(self, node, expected_type=Unknown()):
+        self.record_uses(node)
         computed_type = visit_expression(node, expected_type, self.context(),
                                          self._warnings)
-        if (not type_subset(computed_type, expected_type)
+        if (self._warnings.enabled('type-error')
+                and not type_subset(computed_type, expected_type)
                 and not isinstance(computed_type, Unknown)):
-            details = '{0} vs {1}'.format(computed_type, expected_type)
+            details = Details('{0} vs {1}', computed_type, expected_type)
             self.warn('type-error', node, details)
         return computed_type
 
     def check_assign(self, node, target, value, generator=False):
+        self.record_uses(value)
         assignments = assign(target, value, self._context,
                              self._warnings, generator=generator)
+        if self._recorder is not None:
+            targets = (target.elts if isinstance(target, (ast.Tuple, ast.List))
+                       else [target])
+            for target_node, (name, _, new_symbol) in zip(targets,
+                                                          assignments):
+                if new_symbol is not None:
+                    kind = ('attribute' if isinstance(target_node,
+                                                      ast.Attribute)
+                            else 'variable')
+                    self._recorder.define(name, kind, target_node,
+                                          new_symbol.get_type())
+        reassignment = self._warnings.enabled('reassignment')
+        type_change = self._warnings.enabled('type-change')
+        if not reassignment and not type_change:
+            return
         for name, old_symbol, new_symbol in assignments:
             if old_symbol is not None:
-                self.warn('reassignment', node, name)
-                if new_symbol.get_type() != old_symbol.get_type():
-                    details = '{0}: {1} -> {2}'.format(
-                        name, old_symbol.get_type(), new_symbol.get_type())
+                if reassignment:
+                    self.warn('reassignment', node, name)
+                if (type_change and
+                        new_symbol.get_type() != old_symbol.get_type()):
+                    details = Details('{0}: {1} -> {2}', name,
+                                      old_symbol.get_type(),
+                                      new_symbol.get_type())
                     self.warn('type-change', node, details)
 
     def visit_ClassDef(self, node):
         # ignore warnings on the first pass because we don't have an
         # instance to pass in as "self"
-        visitor = ScopeVisitor(self._filepath, self.context())
+        visitor = ScopeVisitor(self._filepath, self.context(),
+                               warnings=NullWarnings())
         visitor.begin_scope()
         visitor.generic_visit(node)
         scope = visitor.end_scope()
@@ -87,6 +172,11 @@ class ScopeVisitor(ast.NodeVisitor):
         class_type = Class(node.name, signature, return_type, None, scope)
         class_type.evaluator = ClassEvaluator(class_type)
         self._context.add(Symbol(node.name, class_type))
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.define(node.name, 'class', node, class_type,
+                            str(signature))
+            self._recorder = recorder.scope(node.name)
 
         # now visit the class contents to generate warnings
         argument_scope = signature.generic_scope()
@@ -95,16 +185,26 @@ class ScopeVisitor(ast.NodeVisitor):
         self.generic_visit(node)        # now all functiondefs have access
         self.end_scope()                # to class instance to load "self"
         self._class_instance = None
+        self._recorder = recorder
 
     def visit_FunctionDef(self, node):
+        recorder = (self._recorder.scope(node.name)
+                    if self._recorder is not None else None)
         visitor = ScopeVisitor(self._filepath, self.context(),
-                               warnings=self._warnings)
+                               warnings=self._warnings, recorder=recorder)
         function_type = construct_function_type(node, visitor,
                                                 self._class_instance)
         self._context.add(Symbol(node.name, function_type))
+        if recorder is not None:
+            self._recorder.define(node.name, 'function', node, function_type,
+                                  str(function_type.signature))
+            for name, argument_type in function_type.signature.get_list():
+                recorder.define(name, 'argument', node, argument_type)
 
         # now check that all the types are consistent between
         # the default types, annotated types, and constrained types
+        if not self._warnings.enabled('default-argument-type-error'):
+            return
         signature = function_type.signature
         types = zip(signature.names, signature.types,
                     signature.annotated_types, signature.default_types)
@@ -144,6 +244,12 @@ class ScopeVisitor(ast.NodeVisitor):
         self.generic_visit(node)
 
     def visit_AugAssign(self, node):
+        # the target is read before it is assigned, but a name target has a
+        # Store context, which record_uses skips
+        if isinstance(node.target, ast.Name) and self._recorder is not None:
+            self._recorder.use(node.target.id, 'name', node.target,
+                               self._context.get_type(node.target.id))
+        self.record_uses(node.target)
         self.check_assign(node, node.target, node.value)
         self.generic_visit(node)
 
@@ -151,8 +257,16 @@ class ScopeVisitor(ast.NodeVisitor):
         # TODO: need to support identifiers, dict items, attributes, list items
         #names = [target.id for target in node.targets]
         self.warn('delete', node)
+        self.record_uses(node)
+        self.generic_visit(node)
+
+    # statements that are not type checked, only their uses are recorded
+    def visit_Print(self, node):
+        self.record_uses(node)
         self.generic_visit(node)
 
+    visit_Raise = visit_Assert = visit_Exec = visit_Print
+
     def _visit_branch(self, body, inferences):
         # Note: need two scope layers, first for inferences and
         # second for symbols that are assigned within the branch
@@ -189,17 +303,19 @@ class ScopeVisitor(ast.NodeVisitor):
         if_scope = self._visit_branch(node.body, if_inferences)
         else_scope = self._visit_branch(node.orelse, else_inferences)
 
-        diffs = set(if_scope.names()) ^ set(else_scope.names())
-        for diff in diffs:
-            if diff not in self._context:
-                self.warn('conditionally-assigned', node, diff)
+        if self._warnings.enabled('conditionally-assigned'):
+            diffs = set(if_scope.names()) ^ set(else_scope.names())
+            for diff in diffs:
+                if diff not in self._context:
+                    self.warn('conditionally-assigned', node, diff)
 
         common = set(if_scope.names()) & set(else_scope.names())
         for name in common:
             types = [if_scope.get_type(name), else_scope.get_type(name)]
             unified_type = unify_types(types)
             self._context.add(Symbol(name, unified_type))
-            if isinstance(unified_type, Unknown):
+            if (isinstance(unified_type, Unknown)
+                    and self._warnings.enabled('conditional-type')):
                 if not any(isinstance(x, Unknown) for x in types):
                     self.warn('conditional-type', node, name)
 
@@ -222,6 +338,8 @@ class ScopeVisitor(ast.NodeVisitor):
         self.begin_scope()
         if node.optional_vars:
             self.check_assign(node, node.optional_vars, node.context_expr)
+        else:
+            self.record_uses(node.context_expr)
         self.generic_visit(node)
         self.end_scope()
 
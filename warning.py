@@ -1,23 +1,44 @@
+import ast
 from backend import get_token
 
 
+# the categories of analyses that are not given their own, set from the
+# command line: None enables every category that is not disabled; checks of
+# categories that are not enabled are skipped
+ENABLED_CATEGORIES = None
+DISABLED_CATEGORIES = frozenset()
+
+
+def category_enabled(category, enabled=None, disabled=frozenset()):
+    return ((enabled is None or category in enabled)
+            and category not in disabled)
+
+
+def _show_operator(node):
+    return get_token(node.op)
+
+
+def _show_compare(node):
+    return ' '.join([get_token(op) for op in node.ops])
+
+
+# how warnings show the node they are about, other nodes show their class
+NODE_DISPLAYS = {
+    ast.Name: lambda node: node.id,
+    ast.Call: lambda node: show_node(node.func),
+    ast.Attribute: lambda node: '.' + node.attr,
+    ast.BoolOp: _show_operator,
+    ast.BinOp: _show_operator,
+    ast.UnaryOp: _show_operator,
+    ast.Assign: lambda node: show_node(node.targets[0]) + ' = ...',
+    ast.AugAssign: lambda node: show_node(node.target) + ' = ...',
+    ast.Compare: _show_compare,
+}
+
+
 def show_node(node):
-    token = get_token(node)
-    if token == 'Name':
-        return node.id
-    if token == 'Call':
-        return show_node(node.func)
-    if token == 'Attribute':
-        return '.' + node.attr
-    if token in ['BoolOp', 'BinOp', 'UnaryOp']:
-        return get_token(node.op)
-    if token == 'Assign':
-        return show_node(node.targets[0]) + ' = ...'
-    if token == 'AugAssign':
-        return show_node(node.target) + ' = ...'
-    if token == 'Compare':
-        return ' '.join([get_token(op) for op in node.ops])
-    return token
+    display = NODE_DISPLAYS.get(node.__class__)
+    return display(node) if display else get_token(node)
 
 
 class NodeWarning(object):
@@ -26,7 +47,15 @@ class NodeWarning(object):
         self.filepath = filepath
         self.category = category
         self.node = node
-        self.details = details
+        self._details = details
+
+    @property
+    def details(self):
+        # details may hold types that are only formatted when shown
+        if self._details is not None and not isinstance(self._details,
+                                                        basestring):
+            self._details = str(self._details)
+        return self._details
 
     def __str__(self):
         extra = ' ({0})'.format(self.details) if self.details else ''
@@ -35,19 +64,35 @@ class NodeWarning(object):
 
 
 class Warnings(object):
-    def __init__(self, filepath):
+    def __init__(self, filepath, enabled=None, disabled=frozenset()):
         self._filepath = filepath
+        self._enabled = enabled
+        self._disabled = disabled
         self._warnings = []
 
     def __len__(self):
         return len(self._warnings)
 
+    def __iter__(self):
+        return iter(self._warnings)
+
+    def __getitem__(self, index):
+        return self._warnings[index]
+
     def set_filepath(self, filepath):
         self._filepath = filepath
 
+    def enabled(self, category):
+        return category_enabled(category, self._enabled, self._disabled)
+
     def warn(self, node, category, details=None):
+        if not self.enabled(category):
+            return
         warning = NodeWarning(self._filepath, node, category, details)
         self._warnings.append(warning)
 
+    def add(self, warning):
+        self._warnings.append(warning)
+
     def __str__(self):
         return ''.join([str(warning) + '\n' for warning in self._warnings])
@@ -0,0 +1,247 @@
+"""
+Watch mode: analyzes every module under a project directory once, then keeps
+the builtin context, module summaries and import resolutions in memory and
+re-analyzes only modules that changed and the modules that depend on them.
+"""
+import os
+import sys
+import ast
+import time
+from main import analyze, get_module_source_path, get_path_for_level, \
+    forget_module, clear_resolved_modules, register_summary
+from incremental import Definitions
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+
+def project_files(root):
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = [x for x in subdirectories
+                             if not x.startswith('.')]
+        for filename in filenames:
+            if filename.endswith('.py'):
+                yield os.path.abspath(os.path.join(directory, filename))
+
+
+def source_path(module_path):
+    return module_path[:-1] if module_path.endswith(('.pyc', '.pyo')) \
+        else module_path
+
+
+def resolve(import_name, filepath):
+    try:
+        module_path, is_package = get_module_source_path(import_name,
+                                                         filepath)
+    except RuntimeError:
+        return None, False
+    return source_path(module_path), is_package
+
+
+def import_dependencies(tree, filepath):
+    """Mirrors the resolution done by import_chain and visit_ImportFrom, but
+    without analyzing anything."""
+    dependencies = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                path, is_package = filepath, True
+                for name in alias.name.split('.'):
+                    if not is_package:
+                        break
+                    path, is_package = resolve(name, path)
+                    if path is None:
+                        break
+                    dependencies.add(path)
+        elif isinstance(node, ast.ImportFrom):
+            path = get_path_for_level(filepath, node.level)
+            is_package = True
+            parts = node.module.split('.') if node.module else [None]
+            for part in parts:
+                path, is_package = resolve(part, path)
+                if path is None:
+                    break
+                dependencies.add(path)
+            if path is not None and is_package:
+                for alias in node.names:
+                    submodule, _ = resolve(alias.name, path)
+                    if submodule is not None:
+                        dependencies.add(submodule)
+    dependencies.discard(filepath)
+    return dependencies
+
+
+class PollingMonitor(object):
+    def __init__(self, root, interval):
+        self._root = root
+        self._interval = interval
+        self._stats = self._scan()
+
+    def _scan(self):
+        stats = {}
+        for path in project_files(self._root):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (stat.st_mtime, stat.st_size)
+        return stats
+
+    def changes(self):
+        time.sleep(self._interval)
+        stats = self._scan()
+        changed = set(path for path, stat in stats.items()
+                      if self._stats.get(path) != stat)
+        changed.update(set(self._stats) - set(stats))
+        self._stats = stats
+        return changed
+
+
+class InotifyMonitor(object):
+    def __init__(self, root, interval):
+        self._interval_ms = int(interval * 1000)
+        self._changed = set()
+        manager = pyinotify.WatchManager()
+        mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO |
+                pyinotify.IN_MOVED_FROM | pyinotify.IN_DELETE)
+        manager.add_watch(root, mask, rec=True, auto_add=True)
+        self._notifier = pyinotify.Notifier(manager, self._handle_event)
+
+    def _handle_event(self, event):
+        if event.pathname.endswith('.py'):
+            self._changed.add(os.path.abspath(event.pathname))
+
+    def changes(self):
+        if self._notifier.check_events(self._interval_ms):
+            self._notifier.read_events()
+            self._notifier.process_events()
+        changed, self._changed = self._changed, set()
+        return changed
+
+
+class Project(object):
+    def __init__(self, root):
+        self._root = os.path.abspath(root)
+        self._dependencies = {}
+        self._definitions = {}
+
+    def update_dependencies(self, filepath, tree):
+        self._dependencies[filepath] = set(
+            x for x in import_dependencies(tree, filepath)
+            if x.startswith(self._root + os.sep))
+
+    def dependencies(self, filepath):
+        """The project modules that filepath imports directly."""
+        return self._dependencies.get(filepath, set())
+
+    def dependents(self, filepaths):
+        """Returns filepaths plus every module that transitively imports
+        one of them, in breadth-first order."""
+        importers = {}
+        for path, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                importers.setdefault(dependency, set()).add(path)
+        ordered = list(filepaths)
+        seen = set(ordered)
+        index = 0
+        while index < len(ordered):
+            for path in sorted(importers.get(ordered[index], [])):
+                if path not in seen:
+                    seen.add(path)
+                    ordered.append(path)
+            index += 1
+        return ordered
+
+    def dependency_order(self, filepaths):
+        """filepaths ordered so that modules come after the ones they
+        import, apart from import cycles."""
+        remaining = set(filepaths)
+        ordered = []
+
+        def visit(path):
+            remaining.discard(path)
+            for dependency in sorted(self.dependencies(path)):
+                if dependency in remaining:
+                    visit(dependency)
+            ordered.append(path)
+
+        for path in sorted(filepaths):
+            if path in remaining:
+                visit(path)
+        return ordered
+
+    def forget_dependents(self, filepaths):
+        """Forgets the summaries of filepaths and of every module that
+        imports one of them, directly or not, because cache keys only cover
+        a module's own source. Returns those modules in dependency order,
+        for analyzing them again."""
+        dirty = self.dependents(sorted(filepaths))
+        for path in dirty:
+            forget_module(path)
+        return self.dependency_order(dirty)
+
+    def analyze_file(self, filepath):
+        if not os.path.exists(filepath):
+            self._dependencies.pop(filepath, None)
+            self._definitions.pop(filepath, None)
+            return ''
+        with open(filepath) as source_file:
+            source = source_file.read()
+        try:
+            tree = ast.parse(source, filepath)
+        except SyntaxError as error:
+            return '{0}:{1} syntax-error ({2})\n'.format(
+                filepath, error.lineno, error.msg)
+        self.update_dependencies(filepath, tree)
+        definitions = self._definitions.setdefault(filepath, Definitions())
+        try:
+            scope, warnings, _ = analyze(source, filepath, imported=[],
+                                         definitions=definitions)
+        except Exception as error:  # pylint: disable=broad-except
+            # keep watching; the definitions of an interrupted analysis
+            # are incomplete, so the next one starts over
+            self._definitions.pop(filepath, None)
+            return '{0}:0 analysis-failed ({1}: {2})\n'.format(
+                filepath, error.__class__.__name__, error)
+        # dirty modules that import this one use the new summary instead
+        # of analyzing it again
+        register_summary(filepath, source, scope)
+        return str(warnings)
+
+    def analyze_all(self):
+        return [(path, self.analyze_file(path))
+                for path in sorted(project_files(self._root))]
+
+    def update(self, changed):
+        if any(path not in self._dependencies or not os.path.exists(path)
+               for path in changed):
+            # files were added or removed, so imports may resolve differently
+            clear_resolved_modules()
+        return [(path, self.analyze_file(path))
+                for path in self.forget_dependents(changed)]
+
+
+def report(results, elapsed, output=sys.stdout):
+    for _, warnings in results:
+        output.write(warnings)
+    sys.stderr.write('-- analyzed {0} module(s) in {1:.0f} ms\n'.format(
+        len(results), elapsed * 1000))
+    output.flush()
+
+
+def watch(root, interval=0.1):
+    project = Project(root)
+    start = time.time()
+    report(project.analyze_all(), time.time() - start)
+    monitor_class = InotifyMonitor if pyinotify is not None \
+        else PollingMonitor
+    monitor = monitor_class(os.path.abspath(root), interval)
+    try:
+        while True:
+            changed = monitor.changes()
+            if changed:
+                start = time.time()
+                report(project.update(changed), time.time() - start)
+    except KeyboardInterrupt:
+        pass